@@ -0,0 +1,30 @@
+"""add message token count
+
+Revision ID: 3f1d6b8e2a57
+Revises: a7c3f09d5e14
+Create Date: 2026-10-19 15:41:05.518273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1d6b8e2a57'
+down_revision: Union[str, Sequence[str], None] = 'a7c3f09d5e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('messages', sa.Column('token_count', sa.Integer(), nullable=False, server_default='0'))
+    # Backfill with the character-based half of app.core.tokens.estimate_tokens
+    op.execute("UPDATE messages SET token_count = (length(content) + 3) / 4")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('messages', 'token_count')
@@ -0,0 +1,44 @@
+"""add otp email/expires_at index
+
+Revision ID: 4b7e2d91c0a3
+Revises: 17b11d397340
+Create Date: 2026-10-19 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2d91c0a3'
+down_revision: Union[str, Sequence[str], None] = '17b11d397340'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Set on otp_codes.email when this revision adds it, so downgrade only
+# removes a column (and its data) that upgrade created
+ADDED_MARKER = 'added by 4b7e2d91c0a3'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # otp_codes was created without the email column the model declares,
+    # unless the table came from the models (create_all)
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('otp_codes')}
+    if 'email' not in columns:
+        op.add_column('otp_codes', sa.Column('email', sa.String(), nullable=False, server_default='', comment=ADDED_MARKER))
+        op.alter_column('otp_codes', 'email', server_default=None)
+        op.create_index(op.f('ix_otp_codes_email'), 'otp_codes', ['email'], unique=False)
+    op.create_index('ix_otp_codes_email_expires_at', 'otp_codes', ['email', 'expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_otp_codes_email_expires_at', table_name='otp_codes')
+    columns = {c['name']: c for c in sa.inspect(op.get_bind()).get_columns('otp_codes')}
+    if columns.get('email', {}).get('comment') == ADDED_MARKER:
+        op.drop_index(op.f('ix_otp_codes_email'), table_name='otp_codes')
+        op.drop_column('otp_codes', 'email')
@@ -0,0 +1,35 @@
+"""add message idempotency key
+
+Revision ID: 5c8e1a7f3b92
+Revises: 3f1d6b8e2a57
+Create Date: 2026-10-19 16:12:37.904615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c8e1a7f3b92'
+down_revision: Union[str, Sequence[str], None] = '3f1d6b8e2a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('messages', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    op.create_index(
+        'ix_messages_conversation_id_idempotency_key',
+        'messages',
+        ['conversation_id', 'idempotency_key'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_conversation_id_idempotency_key', table_name='messages')
+    op.drop_column('messages', 'idempotency_key')
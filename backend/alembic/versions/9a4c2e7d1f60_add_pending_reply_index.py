@@ -0,0 +1,34 @@
+"""add pending reply index
+
+Revision ID: 9a4c2e7d1f60
+Revises: 5c8e1a7f3b92
+Create Date: 2026-10-19 18:04:11.527390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c2e7d1f60'
+down_revision: Union[str, Sequence[str], None] = '5c8e1a7f3b92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_messages_pending_created_at',
+        'messages',
+        ['created_at'],
+        unique=False,
+        postgresql_where=sa.text("message_type = 'pending'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_pending_created_at', table_name='messages')
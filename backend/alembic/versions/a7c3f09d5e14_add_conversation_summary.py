@@ -0,0 +1,30 @@
+"""add rolling conversation summary
+
+Revision ID: a7c3f09d5e14
+Revises: e2b8d7c4a619
+Create Date: 2026-10-19 15:08:41.236190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3f09d5e14'
+down_revision: Union[str, Sequence[str], None] = 'e2b8d7c4a619'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversations', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('conversations', sa.Column('summary_through_seq', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('conversations', 'summary_through_seq')
+    op.drop_column('conversations', 'summary')
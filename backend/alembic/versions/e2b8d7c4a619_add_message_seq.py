@@ -0,0 +1,55 @@
+"""add per-conversation message sequence
+
+Revision ID: e2b8d7c4a619
+Revises: c6a9e4f1b852
+Create Date: 2026-10-19 14:22:10.774302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b8d7c4a619'
+down_revision: Union[str, Sequence[str], None] = 'c6a9e4f1b852'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversations', sa.Column('last_seq', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('messages', sa.Column('seq', sa.Integer(), nullable=True))
+
+    # Backfill: existing user/assistant pairs often share created_at, so put the user message first
+    op.execute("""
+        UPDATE messages AS m
+        SET seq = ordered.rn
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY conversation_id
+                ORDER BY created_at, CASE WHEN role = 'user' THEN 0 ELSE 1 END, id
+            ) AS rn
+            FROM messages
+        ) AS ordered
+        WHERE m.id = ordered.id
+    """)
+    op.execute("""
+        UPDATE conversations AS c
+        SET last_seq = COALESCE((SELECT max(seq) FROM messages WHERE conversation_id = c.id), 0)
+    """)
+
+    op.alter_column('messages', 'seq', nullable=False)
+    op.create_index('ix_messages_conversation_id_seq', 'messages', ['conversation_id', 'seq'], unique=True)
+    # Covered by the composite index above
+    op.drop_index(op.f('ix_messages_conversation_id'), table_name='messages')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_messages_conversation_id'), 'messages', ['conversation_id'], unique=False)
+    op.drop_index('ix_messages_conversation_id_seq', table_name='messages')
+    op.drop_column('messages', 'seq')
+    op.drop_column('conversations', 'last_seq')
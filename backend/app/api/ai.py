@@ -1,141 +1,741 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Awaitable, Callable, List, Dict, Any, Optional
+import asyncio
+import hashlib
+import json
 import logging
+import re
+import time
+import uuid
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, delete, or_, select
 
 from app.db.models.user import User
-from app.db.models.chat import Conversation, Message
-from app.api.deps import get_current_user, get_db
-from app.services.safety import detect_crisis
-from app.services.llm import EnhancedGenerativeAIClient
+from app.db.models.chat import PENDING_REPLY_TYPE, Conversation, Message
+from app.api.deps import get_current_user, get_current_user_optional, get_db
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.security import chat_limiter, get_client_ip, rate_limit
+from app.core.singleflight import SingleFlight
+from app.db.session import get_async_session_local
+from app.services.chat_history import allocate_seq, get_recent_turns, record_turn, history_cache
+from app.services.chat_persistence import pending_reply, persist_reply, reply_placeholder
+from app.services.chat_session import ChatSession
+from app.services.conversation_memory import build_context, maybe_summarize, needs_summary
+from app.services.safety import crisis_category
+from app.services.llm import EnhancedGenerativeAIClient, LLMStreamError, coalesce_stream
+from app.services.llm_dispatch import LLMOverloaded, Priority, priority_for
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 # Initialize the Gemini API client
 ai_client = EnhancedGenerativeAIClient()
 
+CRISIS_REPLY = "I'm very concerned about what you've shared. You are not alone, and help is available right now. Please reach out to one of these free, confidential resources immediately:\n\n**National Suicide Prevention Lifeline:** 988\n**Crisis Text Line:** Text HOME to 741741\n**Emergency Services:** 911\n\nYour life has value. Please talk to someone who can provide immediate professional support."
+
+STREAM_ERROR_DETAIL = "Sorry, my reply was cut off. Please try sending your message again."
+
+# Concurrent duplicate /chat submissions in a conversation share one turn
+_chat_turns = SingleFlight("chat-turn")
+
 class ChatMessage(BaseModel):
     text: str
     model: Optional[str] = None
+    # Streaming only: optional per-chunk "typing" delay for presentation
+    pacing_ms: Optional[int] = Field(default=None, ge=0, le=500)
 
 class ChatResponse(BaseModel):
     reply: str
     type: str
     confidence: float
 
-@router.post("/chat", response_model=ChatResponse)
+
+async def _get_or_create_conversation(db: AsyncSession, user: User) -> Conversation:
+    """Get or create the user's active conversation"""
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.user_id == user.id,
+            Conversation.is_active == True
+        ).order_by(Conversation.created_at.desc()).limit(1)
+    )
+    conversation = result.scalar_one_or_none()
+    
+    if not conversation:
+        conversation = Conversation(user_id=user.id, title="Open Chat")
+        db.add(conversation)
+        await db.flush()  # get the ID
+    return conversation
+
+
+async def _history_with(
+    db: AsyncSession,
+    conversation: Conversation,
+    user_msg: Message
+) -> List[Dict[str, str]]:
+    """Rolling summary, budgeted recent context and the new user message, formatted for the LLM"""
+    history = await get_recent_turns(
+        db, conversation.id, user_msg.seq - 1, limit=settings.chat_history_messages - 1
+    )
+    return build_context(
+        conversation.summary,
+        conversation.summary_through_seq or 0,
+        history,
+        {"role": "user", "content": user_msg.content}
+    )
+
+
+async def _stored_reply(db: AsyncSession, conversation_id: uuid.UUID, idempotency_key: str) -> Optional[ChatResponse]:
+    """The reply already stored for a turn submitted with this Idempotency-Key"""
+    result = await db.execute(
+        select(Message.seq).where(
+            Message.conversation_id == conversation_id,
+            Message.idempotency_key == idempotency_key
+        )
+    )
+    user_seq = result.scalar_one_or_none()
+    if user_seq is None:
+        return None
+    result = await db.execute(
+        select(Message.content, Message.message_type, Message.confidence).where(
+            Message.conversation_id == conversation_id,
+            Message.seq == user_seq + 1,
+            Message.stored_clause()
+        )
+    )
+    reply = result.first()
+    if reply is None:
+        # Generated on this worker and still being written
+        reply = pending_reply(conversation_id, user_seq + 1)
+    if reply is None:
+        # Stored by a request that is still generating its reply
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"}
+        )
+    return ChatResponse(reply=reply.content, type=reply.message_type or "normal", confidence=reply.confidence or 0.0)
+
+
+def _summarize_after(conversation_id: uuid.UUID, summary_through_seq: int, reply_seq: int):
+    """Post-store hook that condenses aged-out messages, if any are due"""
+    if not needs_summary(summary_through_seq, reply_seq):
+        return None
+    return lambda: maybe_summarize(conversation_id, ai_client)
+
+
+async def _forget_user_message(db: AsyncSession, conversation_id: uuid.UUID, user_msg: Message) -> None:
+    """Undo an already committed user message (and its reply placeholder) whose turn could not be answered"""
+    history_cache.invalidate(conversation_id)
+    try:
+        await db.rollback()
+        await db.execute(delete(Message).where(or_(
+            Message.id == user_msg.id,
+            and_(
+                Message.conversation_id == conversation_id,
+                Message.seq == user_msg.seq + 1,
+                Message.message_type == PENDING_REPLY_TYPE
+            )
+        )))
+        await db.commit()
+    except Exception as e:
+        logger.error(f"Failed to remove unanswered message in conversation {conversation_id}: {str(e)}")
+
+
+@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(rate_limit(chat_limiter))])
 async def chat_with_companion(
     message: ChatMessage,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(default=None, max_length=64)
 ):
     """
     Open Chat endpoint for the YuVA Companion.
     Includes deterministic crisis detection before forwarding to Gemini.
     Returns structured JSON responses as mandated by the implementation plan.
+    Retries carrying the same ``Idempotency-Key`` header return the stored reply,
+    and concurrent duplicate submissions are answered by a single turn.
+    Replies slower than ``chat_reply_budget_seconds`` come from the local
+    responder with type ``fallback``.
+    The user's message is committed before the model is called; the reply is
+    stored in the background after the response is sent.
     """
     user_text = message.text.strip()
     
     if not user_text:
         raise HTTPException(status_code=400, detail="Message cannot be empty")
 
+    conversation = await _get_or_create_conversation(db, current_user)
+    if idempotency_key:
+        stored = await _stored_reply(db, conversation.id, idempotency_key)
+        if stored is not None:
+            metrics.counter("chat_idempotent_replays_total").inc()
+            return stored
+        flight_key = (conversation.id, "key", idempotency_key)
+    else:
+        flight_key = (conversation.id, "text", hashlib.sha256(user_text.encode()).hexdigest())
+
+    return await _chat_turns.do(flight_key, lambda: _chat_turn(
+        db, conversation, current_user, user_text, message.model, idempotency_key
+    ))
+
+
+async def _chat_turn(
+    db: AsyncSession,
+    conversation: Conversation,
+    current_user: User,
+    user_text: str,
+    model: Optional[str],
+    idempotency_key: Optional[str]
+) -> ChatResponse:
+    """Commit the user message, generate the reply and hand it over for storage"""
     # 1. Deterministic Crisis Detection Layer
-    is_crisis = detect_crisis(user_text)
-    
-    # Get or create active conversation
-    result = await db.execute(
-        select(Conversation).where(
-            Conversation.user_id == current_user.id,
-            Conversation.is_active == True
-        ).order_by(Conversation.created_at.desc()).limit(1)
-    )
-    conversation = result.scalar_one_or_none()
+    crisis = crisis_category(user_text)
     
-    if not conversation:
-        conversation = Conversation(user_id=current_user.id, title="Open Chat")
-        db.add(conversation)
-        await db.flush()  # get the ID
+    # Reserve positions for this turn's user message and reply
+    user_seq = await allocate_seq(db, conversation.id, 2)
 
     # Always save the user's message
     user_msg = Message(
         conversation_id=conversation.id,
+        seq=user_seq,
         role="user",
         content=user_text,
-        message_type="normal"
+        message_type="normal",
+        idempotency_key=idempotency_key
     )
     db.add(user_msg)
-    await db.flush()  # get the message ID
+    try:
+        await db.flush()  # get the message ID
+    except IntegrityError:
+        # Same Idempotency-Key already claimed by a request on another worker
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"}
+        )
 
-    if is_crisis:
-        logger.warning(f"Crisis detected for user {current_user.id}")
-        
-        reply_text = "I'm very concerned about what you've shared. You are not alone, and help is available right now. Please reach out to one of these free, confidential resources immediately:\n\n**National Suicide Prevention Lifeline:** 988\n**Crisis Text Line:** Text HOME to 741741\n**Emergency Services:** 911\n\nYour life has value. Please talk to someone who can provide immediate professional support."
+    if crisis:
+        logger.warning(f"Crisis ({crisis}) detected for user {current_user.id}")
+        metrics.counter("chat_crisis_detected_total", category=crisis).inc()
         
         # Save structured crisis support response (Skip Gemini)
         ai_msg = Message(
             conversation_id=conversation.id,
+            seq=user_seq + 1,
             role="assistant",
-            content=reply_text,
+            content=CRISIS_REPLY,
             message_type="crisis",
             confidence=1.0
         )
         db.add(ai_msg)
         await db.commit()
+        record_turn(conversation.id, user_msg)
+        record_turn(conversation.id, ai_msg)
         
         return ChatResponse(
-            reply=reply_text,
+            reply=CRISIS_REPLY,
             type="crisis",
             confidence=1.0
         )
 
-    # 2. Forward to Gemini if safe
+    # 2. Commit the user message and the reply's placeholder now so no
+    # transaction is held open while the model works
+    gemini_messages = await _history_with(db, conversation, user_msg)
+    summary_through_seq = conversation.summary_through_seq or 0
+    db.add(reply_placeholder(conversation.id, user_seq + 1))
+    await db.commit()
+    record_turn(conversation.id, user_msg)
+
+    # 3. Forward to Gemini if safe
     try:
-        # Retrieve past conversation history for context (last 10 messages)
-        msg_result = await db.execute(
-            select(Message).where(
-                Message.conversation_id == conversation.id
-            ).order_by(Message.created_at.asc())
-        )
-        history = msg_result.scalars().all()
-        
-        # Keep recent context (last 10 turns = 20 messages)
-        recent_history = history[-20:]
-        
-        # Format the message history for the LLM
-        gemini_messages = [{"role": m.role, "content": m.content} for m in recent_history]
-        
-        gemini_response_text = await ai_client.chat(gemini_messages, model_override=message.model)
-        
-        # Save AI Reply
-        ai_msg = Message(
-            conversation_id=conversation.id,
-            role="assistant",
-            content=gemini_response_text,
-            message_type="normal",
-            confidence=0.9
+        try:
+            gemini_response_text = await ai_client.chat(
+                gemini_messages,
+                model_override=model,
+                priority=priority_for(current_user),
+                timeout=settings.chat_reply_budget_seconds or None,
+                opening=user_seq == 1
+            )
+            reply_type, confidence = "normal", 0.9
+        except asyncio.TimeoutError:
+            # A quick local answer beats a very slow perfect one
+            model_name = model or ai_client.model_name
+            logger.warning(f"Reply budget exceeded for {model_name}; answering locally")
+            metrics.counter("chat_hedged_total", model=model_name, mode="reply").inc()
+            gemini_response_text = ai_client.fallback_reply(gemini_messages, model)
+            reply_type, confidence = "fallback", 0.5
+    except LLMOverloaded as e:
+        logger.warning(f"Chat turn not admitted: {str(e)}")
+        await _forget_user_message(db, conversation.id, user_msg)
+        raise HTTPException(
+            status_code=503,
+            detail="YuVA is busy right now. Please try again in a moment.",
+            headers={"Retry-After": str(e.retry_after)}
         )
-        db.add(ai_msg)
-        await db.commit()
-        
-        # 3. Structured Output Response
-        return ChatResponse(
-            reply=gemini_response_text,
-            type="normal",
-            confidence=0.9
-        )
-        
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        logger.error(f"Error communicating with AI: {str(e)}")
-        await db.rollback()
+    except Exception:
+        logger.exception("Error communicating with AI")
+        await _forget_user_message(db, conversation.id, user_msg)
         # Graceful fallback instead of raw error
         return ChatResponse(
             reply="I'm experiencing a bit of trouble finding the right words right now, but I am still here. Could you try sending your message again?",
             type="error",
             confidence=0.0
         )
+
+    # 4. Store the reply after the response is sent (retried until it is stored)
+    persist_reply(
+        conversation.id,
+        user_seq + 1,
+        gemini_response_text,
+        reply_type,
+        confidence,
+        then=_summarize_after(conversation.id, summary_through_seq, user_seq + 1)
+    )
+
+    # 5. Structured Output Response
+    return ChatResponse(
+        reply=gemini_response_text,
+        type=reply_type,
+        confidence=confidence
+    )
+
+
+@dataclass
+class _StreamedReply:
+    """A reply as streamed so far, and how it was produced"""
+    parts: List[str] = field(default_factory=list)
+    type: str = "normal"
+    confidence: float = 0.9
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+async def _stream_reply(
+    reply: _StreamedReply,
+    gemini_messages: List[Dict[str, str]],
+    model_override: Optional[str],
+    pacing: float,
+    priority: Priority,
+    opening: bool
+) -> AsyncGenerator[str, None]:
+    """
+    Coalesced reply chunks, also collected into ``reply``. If no token arrives
+    within ``chat_first_token_budget_seconds`` the local responder answers
+    instead and ``reply.type`` becomes ``fallback``.
+    """
+    model = model_override or ai_client.model_name
+    started = time.perf_counter()
+
+    def coalesced(stream):
+        return coalesce_stream(
+            stream,
+            max_chars=settings.stream_coalesce_chars,
+            max_delay=settings.stream_coalesce_ms / 1000
+        )
+
+    stream = coalesced(ai_client.chat_stream(
+        gemini_messages,
+        model_override=model_override,
+        pacing=pacing,
+        priority=priority,
+        first_token_timeout=settings.chat_first_token_budget_seconds or None,
+        opening=opening
+    ))
+    try:
+        async for chunk in stream:
+            if not reply.parts:
+                metrics.summary("chat_stream_ttft_seconds", model=model).observe(time.perf_counter() - started)
+            reply.parts.append(chunk)
+            yield chunk
+    except asyncio.TimeoutError:
+        # No first token within budget: stream a local answer instead
+        logger.warning(f"First-token budget exceeded for {model}; answering locally")
+        metrics.counter("chat_hedged_total", model=model, mode="stream").inc()
+        reply.type, reply.confidence = "fallback", 0.5
+        async for chunk in coalesced(ai_client.fallback_stream(gemini_messages, model_override, pacing=pacing)):
+            reply.parts.append(chunk)
+            yield chunk
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream", dependencies=[Depends(rate_limit(chat_limiter))])
+async def chat_with_companion_stream(
+    message: ChatMessage,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Streaming variant of /chat using Server-Sent Events.
+    Events: ``token`` ({"text"}) as the reply is generated, then ``done``
+    ({"type", "confidence"}). Crisis messages get a single ``crisis`` event, and
+    an ``error`` event ({"detail", "retry_after"}) is sent if the model is at
+    capacity or the upstream stream breaks off.
+    If no token arrives within ``chat_first_token_budget_seconds`` the local
+    responder answers instead and ``done`` carries type ``fallback``.
+    The reply is stored once the stream finishes, or as a ``partial`` message
+    if the client disconnects or the upstream stream breaks off mid-reply.
+    """
+    user_text = message.text.strip()
+    
+    if not user_text:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+
+    # 1. Crisis detection runs before anything is streamed
+    crisis = crisis_category(user_text)
+
+    conversation = await _get_or_create_conversation(db, current_user)
+    conversation_id = conversation.id
+    user_seq = await allocate_seq(db, conversation_id, 2)
+    user_msg = Message(
+        conversation_id=conversation_id,
+        seq=user_seq,
+        role="user",
+        content=user_text,
+        message_type="normal"
+    )
+    db.add(user_msg)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    if crisis:
+        logger.warning(f"Crisis ({crisis}) detected for user {current_user.id}")
+        metrics.counter("chat_crisis_detected_total", category=crisis).inc()
+        ai_msg = Message(
+            conversation_id=conversation_id,
+            seq=user_seq + 1,
+            role="assistant",
+            content=CRISIS_REPLY,
+            message_type="crisis",
+            confidence=1.0
+        )
+        db.add(ai_msg)
+        await db.commit()
+        record_turn(conversation_id, user_msg)
+        record_turn(conversation_id, ai_msg)
+
+        async def crisis_stream():
+            yield _sse("crisis", {"reply": CRISIS_REPLY, "type": "crisis", "confidence": 1.0})
+            yield _sse("done", {"type": "crisis", "confidence": 1.0})
+
+        return StreamingResponse(crisis_stream(), media_type="text/event-stream", headers=headers)
+
+    await db.flush()
+    gemini_messages = await _history_with(db, conversation, user_msg)
+    summary_through_seq = conversation.summary_through_seq or 0
+    # Commit now, with the reply's placeholder, so no transaction is held open while tokens stream
+    db.add(reply_placeholder(conversation_id, user_seq + 1))
+    await db.commit()
+    record_turn(conversation_id, user_msg)
+
+    model = message.model or ai_client.model_name
+    pacing = (message.pacing_ms or 0) / 1000
+    priority = priority_for(current_user)
+
+    async def event_stream():
+        started = time.perf_counter()
+        reply = _StreamedReply()
+        completed = False
+        try:
+            async for chunk in _stream_reply(reply, gemini_messages, message.model, pacing, priority, user_seq == 1):
+                yield _sse("token", {"text": chunk})
+            completed = True
+            yield _sse("done", {"type": reply.type, "confidence": reply.confidence})
+        except LLMOverloaded as e:
+            logger.warning(f"Chat stream not admitted: {str(e)}")
+            # The request session is not usable once the response has started
+            session_local = get_async_session_local()
+            async with session_local() as forget_db:
+                await _forget_user_message(forget_db, conversation_id, user_msg)
+            yield _sse("error", {"detail": "YuVA is busy right now. Please try again in a moment.", "retry_after": e.retry_after})
+        except LLMStreamError as e:
+            logger.warning(f"Chat stream broke off: {str(e)}")
+            yield _sse("error", {"detail": STREAM_ERROR_DETAIL, "retry_after": 1})
+        finally:
+            metrics.summary("chat_stream_duration_seconds", model=model).observe(time.perf_counter() - started)
+            if not completed:
+                metrics.counter("chat_stream_interrupted_total", model=model).inc()
+            text = reply.text
+            if text:
+                persist_reply(
+                    conversation_id,
+                    user_seq + 1,
+                    text,
+                    reply.type if completed else "partial",
+                    reply.confidence if completed else 0.0,
+                    then=_summarize_after(conversation_id, summary_through_seq, user_seq + 1)
+                )
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
+
+# Application close codes for the chat socket
+WS_UNAUTHORIZED = 4401
+WS_IDLE = 4408
+
+
+def _origin_allowed(origin: Optional[str]) -> bool:
+    """CORS does not cover WebSockets, so a cookie-authenticated socket checks Origin itself"""
+    if origin is None:
+        # Not a browser
+        return True
+    if origin in settings.allowed_origins:
+        return True
+    return bool(settings.allow_origin_regex and re.fullmatch(settings.allow_origin_regex, origin))
+
+
+async def _receive_frame(websocket: WebSocket) -> Optional[Dict[str, Any]]:
+    """Next JSON object from the client; None for a malformed frame"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+    try:
+        frame = json.loads(message.get("text") or message.get("bytes") or "")
+    except ValueError:
+        return None
+    return frame if isinstance(frame, dict) else None
+
+
+def _summarize_and_refresh(session: ChatSession, reply_seq: int):
+    """Post-store hook that condenses aged-out messages and updates the session's summary"""
+    summarize = _summarize_after(session.conversation_id, session.summary_through_seq, reply_seq)
+    if summarize is None:
+        return None
+
+    async def run():
+        await summarize()
+        await session.refresh_summary()
+    return run
+
+
+async def _socket_turn(
+    session: ChatSession,
+    send: Callable[..., Awaitable[None]],
+    message: ChatMessage,
+    priority: Priority
+) -> None:
+    """One chat turn on a socket: store the user message, stream the reply, hand it over for storage"""
+    user_text = message.text.strip()
+    crisis = crisis_category(user_text)
+    conversation_id = session.conversation_id
+
+    session_local = get_async_session_local()
+    async with session_local() as db:
+        user_msg = await session.begin_turn(db, user_text)
+        reply_seq = user_msg.seq + 1
+        if crisis:
+            ai_msg = Message(
+                conversation_id=conversation_id,
+                seq=reply_seq,
+                role="assistant",
+                content=CRISIS_REPLY,
+                message_type="crisis",
+                confidence=1.0
+            )
+            db.add(ai_msg)
+        else:
+            gemini_messages = session.context(user_msg)
+            db.add(reply_placeholder(conversation_id, reply_seq))
+        await db.commit()
+    session.record(user_msg.seq, "user", user_text)
+    record_turn(conversation_id, user_msg)
+
+    if crisis:
+        logger.warning(f"Crisis ({crisis}) detected for user {session.user_id}")
+        metrics.counter("chat_crisis_detected_total", category=crisis).inc()
+        session.record(reply_seq, "assistant", CRISIS_REPLY)
+        record_turn(conversation_id, ai_msg)
+        await send("crisis", reply=CRISIS_REPLY, reply_type="crisis", confidence=1.0)
+        await send("done", reply_type="crisis", confidence=1.0)
+        return
+
+    model = message.model or ai_client.model_name
+    started = time.perf_counter()
+    reply = _StreamedReply()
+    completed = False
+    try:
+        await send("typing", active=True)
+        async for chunk in _stream_reply(
+            reply, gemini_messages, message.model, (message.pacing_ms or 0) / 1000, priority, user_msg.seq == 1
+        ):
+            await send("token", text=chunk)
+        completed = True
+        await send("done", reply_type=reply.type, confidence=reply.confidence)
+    except LLMOverloaded as e:
+        logger.warning(f"Chat socket turn not admitted: {str(e)}")
+        async with session_local() as db:
+            await _forget_user_message(db, conversation_id, user_msg)
+        session.forget(user_msg.seq)
+        await send("error", detail="YuVA is busy right now. Please try again in a moment.", retry_after=e.retry_after)
+    except LLMStreamError as e:
+        logger.warning(f"Chat socket stream broke off: {str(e)}")
+        await send("error", detail=STREAM_ERROR_DETAIL, retry_after=1)
+    finally:
+        metrics.summary("chat_stream_duration_seconds", model=model).observe(time.perf_counter() - started)
+        if not completed:
+            metrics.counter("chat_stream_interrupted_total", model=model).inc()
+        text = reply.text
+        if text:
+            persist_reply(
+                conversation_id,
+                reply_seq,
+                text,
+                reply.type if completed else "partial",
+                reply.confidence if completed else 0.0,
+                then=_summarize_and_refresh(session, reply_seq)
+            )
+            session.record(reply_seq, "assistant", text)
+        else:
+            session.skip(reply_seq)
+
+
+async def _run_socket_turn(
+    session: ChatSession,
+    send: Callable[..., Awaitable[None]],
+    message: ChatMessage,
+    priority: Priority
+) -> None:
+    """Turn task body: failures are reported to the client instead of being lost with the task"""
+    try:
+        await _socket_turn(session, send, message, priority)
+    except Exception as e:
+        logger.error(f"Chat socket turn failed for conversation {session.conversation_id}: {str(e)}")
+        try:
+            await send("error", detail="I'm experiencing a bit of trouble finding the right words right now, but I am still here. Could you try sending your message again?")
+        except Exception:
+            pass
+
+
+async def _heartbeat(send: Callable[..., Awaitable[None]]) -> None:
+    """Server pings so proxies keep the connection open and dead peers are noticed"""
+    try:
+        while True:
+            await asyncio.sleep(settings.chat_ws_heartbeat_seconds)
+            await send("ping")
+    except Exception:
+        # The socket is gone; the receive loop notices and cleans up
+        return
+
+
+@router.websocket("/chat/ws")
+async def chat_socket(websocket: WebSocket):
+    """
+    Open Chat over a WebSocket, for long sessions.
+    The connection authenticates once and keeps the active conversation and its
+    recent turns in memory (``ChatSession``), so a turn needs one short
+    transaction and no history read. Replies stream token by token; heartbeat
+    and typing signals share the socket.
+
+    Client frames (JSON, ``type`` selects the kind):
+      ``auth`` {"token"?}: must be first; without a token the client_id cookie is used
+      ``message`` {"text", "model"?, "pacing_ms"?}: one turn at a time
+      ``cancel``: stop the reply being streamed; it is stored as ``partial``
+      ``typing`` {"active"}, ``ping``, ``pong``: liveness
+    Server frames: ``ready`` {"conversation_id"}; per turn ``typing`` {"active"},
+    ``token`` {"text"}..., then ``done`` {"reply_type", "confidence"}; ``crisis``
+    {"reply", "reply_type", "confidence"} before ``done`` for crisis messages;
+    ``error`` {"detail", "retry_after"?}; ``ping`` every
+    ``chat_ws_heartbeat_seconds``; ``pong``.
+    Closed with 4401 if authentication fails and 4408 after
+    ``chat_ws_idle_timeout_seconds`` without a client frame.
+    """
+    if not _origin_allowed(websocket.headers.get("origin")):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    try:
+        frame = await asyncio.wait_for(_receive_frame(websocket), timeout=settings.chat_ws_auth_timeout_seconds)
+    except asyncio.TimeoutError:
+        frame = None
+    except WebSocketDisconnect:
+        return
+    if frame is None or frame.get("type") != "auth":
+        await websocket.close(code=WS_UNAUTHORIZED, reason="Authentication required")
+        return
+
+    token = frame.get("token")
+    session_local = get_async_session_local()
+    async with session_local() as db:
+        current_user = await get_current_user_optional(websocket, token if isinstance(token, str) else None, db)
+        if current_user is None:
+            await websocket.close(code=WS_UNAUTHORIZED, reason="Authentication required")
+            return
+        conversation = await _get_or_create_conversation(db, current_user)
+        session = await ChatSession.open(db, conversation)
+        await db.commit()
+    priority = priority_for(current_user)
+    client_ip = get_client_ip(websocket)
+
+    # Turn, heartbeat and receive loop all write to the socket
+    send_lock = asyncio.Lock()
+
+    async def send(kind: str, **data: Any) -> None:
+        async with send_lock:
+            await websocket.send_json({"type": kind, **data})
+
+    metrics.gauge("chat_ws_connections").inc()
+    heartbeat = asyncio.create_task(_heartbeat(send))
+    turn: Optional[asyncio.Task] = None
+    try:
+        await send("ready", conversation_id=str(session.conversation_id))
+        while True:
+            try:
+                frame = await asyncio.wait_for(_receive_frame(websocket), timeout=settings.chat_ws_idle_timeout_seconds)
+            except asyncio.TimeoutError:
+                await websocket.close(code=WS_IDLE, reason="Idle timeout")
+                break
+            kind = frame.get("type") if frame is not None else None
+
+            if kind == "message":
+                if turn is not None and not turn.done():
+                    await send("error", detail="Please wait for the current reply to finish")
+                    continue
+                try:
+                    message = ChatMessage.model_validate(frame)
+                except ValidationError:
+                    await send("error", detail="Invalid message")
+                    continue
+                if not message.text.strip():
+                    await send("error", detail="Message cannot be empty")
+                    continue
+                allowed, _, retry_after = await chat_limiter.hit(client_ip)
+                if not allowed:
+                    await send("error", detail="Too many requests. Please try again later.", retry_after=retry_after)
+                    continue
+                metrics.counter("chat_ws_turns_total").inc()
+                turn = asyncio.create_task(_run_socket_turn(session, send, message, priority))
+            elif kind == "cancel":
+                if turn is not None and not turn.done():
+                    turn.cancel()
+                    await asyncio.gather(turn, return_exceptions=True)
+                    await send("done", reply_type="partial", confidence=0.0)
+            elif kind == "ping":
+                await send("pong")
+            elif kind in ("pong", "typing"):
+                continue
+            else:
+                await send("error", detail="Unknown or malformed frame")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        heartbeat.cancel()
+        if turn is not None and not turn.done():
+            # Whatever was streamed is still stored, as a partial reply
+            turn.cancel()
+            await asyncio.gather(turn, return_exceptions=True)
+        metrics.gauge("chat_ws_connections").dec()
+
@@ -15,10 +15,10 @@ from app.schemas.auth import (
     RecoveryCodeResetRequest
 )
 from app.services.auth_service import AuthService
-from app.core.security import create_access_token
-from .deps import get_current_user, get_client_id_from_request
+from app.core.security import create_access_token, decode_token, rate_limit, login_limiter, otp_limiter
+from app.services.revocation import revocation_list
+from .deps import get_current_user, get_client_id_from_request, get_user_from_token, oauth2_scheme as optional_oauth2_scheme
 import logging
-import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +27,7 @@ settings = get_settings()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-@router.post("/login", response_model=AuthResponse)
+@router.post("/login", response_model=AuthResponse, dependencies=[Depends(rate_limit(login_limiter))])
 async def login(
     credentials: LoginRequest,
     response: Response,
@@ -58,7 +58,8 @@ async def login(
         data={
             "sub": str(user.id),
             "first_name": user.first_name,
-            "email": user.email
+            "email": user.email,
+            "epoch": user.token_epoch
         }
     )
     
@@ -94,7 +95,8 @@ async def google_login(
         data={
             "sub": str(user.id),
             "first_name": user.first_name,
-            "email": user.email
+            "email": user.email,
+            "epoch": user.token_epoch
         }
     )
     
@@ -105,7 +107,7 @@ async def google_login(
         requires_otp=False
     )
 
-@router.post("/register", response_model=AuthResponse)
+@router.post("/register", response_model=AuthResponse, dependencies=[Depends(rate_limit(login_limiter))])
 async def register(
     user_data: RegisterRequest,
     response: Response,
@@ -131,7 +133,8 @@ async def register(
         data={
             "sub": str(user.id),
             "first_name": user.first_name,
-            "email": user.email
+            "email": user.email,
+            "epoch": user.token_epoch
         }
     )
         
@@ -176,8 +179,17 @@ async def create_guest(
     )
 
 @router.post("/logout", response_model=LogoutResponse)
-async def logout(response: Response):
-    """Logout"""
+async def logout(
+    response: Response,
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+):
+    """Logout: revoke the presented access token and clear the guest cookie"""
+    if token:
+        try:
+            await revocation_list.revoke_payload(db, decode_token(token))
+        except HTTPException:
+            pass  # Invalid or expired token: nothing to revoke
     response.delete_cookie(key="client_id")
     return LogoutResponse(message="Logged out successfully")
 
@@ -199,10 +211,20 @@ async def change_password(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=message
         )
-        
-    return {"message": message}
+    
+    # The password change revoked every earlier token, including this one
+    await db.refresh(current_user)
+    access_token = create_access_token(
+        data={
+            "sub": str(current_user.id),
+            "first_name": current_user.first_name,
+            "email": current_user.email,
+            "epoch": current_user.token_epoch
+        }
+    )
+    return {"message": message, "access_token": access_token}
 
-@router.post("/reset-password-recovery")
+@router.post("/reset-password-recovery", dependencies=[Depends(rate_limit(otp_limiter))])
 async def reset_password_recovery(
     request: RecoveryCodeResetRequest,
     db: AsyncSession = Depends(get_db)
@@ -258,22 +280,10 @@ async def check_existing_session(
     # Extract token
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
-        from app.core.security import decode_token, verify_token_scope
         token = auth_header.split(" ")[1]
-        try:
-            payload = decode_token(token)
-            verify_token_scope(payload, "access")
-            user_id = payload.get("sub")
-            if user_id:
-                # Fetch user
-                from app.db.models.user import User
-                from sqlalchemy import select
-                result = await db.execute(select(User).where(User.id == uuid.UUID(user_id)))
-                user = result.scalar_one_or_none()
-                if user:
-                    return UserResponse.model_validate(user)
-        except Exception:
-            pass
+        user = await get_user_from_token(token, db)
+        if user:
+            return UserResponse.model_validate(user)
             
     # Fallback to cookie
     client_id = get_client_id_from_request(request)
@@ -0,0 +1,230 @@
+"""
+Conversation History API Router
+
+Read-only access to a user's past conversations and their messages, for
+restoring the chat on any device. Queries are Core selects of just the
+columns returned (no ORM entities or relationship loading), pages use keyset
+cursors, and every response carries an ETag so an unchanged history
+revalidates as a 304 without reading or serializing any messages.
+"""
+import base64
+import hashlib
+import json
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from pydantic import BaseModel
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_user
+from app.core.metrics import metrics
+from app.db.models.chat import Conversation, Message
+from app.db.models.user import User
+from app.db.session import get_db
+
+router = APIRouter()
+
+# Browsers may keep the body but must revalidate it (If-None-Match) before use
+CACHE_CONTROL = "private, no-cache"
+
+
+class ConversationSummary(BaseModel):
+    id: uuid.UUID
+    title: Optional[str]
+    is_active: bool
+    message_count: int
+    created_at: datetime
+
+
+class ConversationPage(BaseModel):
+    conversations: List[ConversationSummary]
+    # Pass as ``cursor`` to get the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
+
+
+class HistoryMessage(BaseModel):
+    seq: int
+    role: str
+    content: str
+    type: str
+    confidence: Optional[float]
+    created_at: datetime
+
+
+class MessagePage(BaseModel):
+    conversation_id: uuid.UUID
+    # Oldest first, as displayed
+    messages: List[HistoryMessage]
+    # Pass as ``before`` to get the previous (older) page; None at the start
+    next_before: Optional[int] = None
+
+
+def _etag(*parts) -> str:
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+def _cached(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def _encode_cursor(created_at: datetime, conversation_id: uuid.UUID) -> str:
+    raw = json.dumps([created_at.isoformat(), str(conversation_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, conversation_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), uuid.UUID(conversation_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/conversations", response_model=ConversationPage)
+async def list_conversations(
+    response: Response,
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """Current user's conversations, newest first"""
+    # last_seq counts reserved positions too (failed or dropped turns), so count the stored rows;
+    # a reply placeholder is not shown until it has been filled in
+    message_count = (
+        select(func.count())
+        .select_from(Message)
+        .where(Message.conversation_id == Conversation.id, Message.stored_clause())
+        .scalar_subquery()
+    )
+    query = (
+        select(
+            Conversation.id,
+            Conversation.title,
+            Conversation.is_active,
+            message_count.label("message_count"),
+            Conversation.created_at
+        )
+        .where(Conversation.user_id == current_user.id)
+        .order_by(Conversation.created_at.desc(), Conversation.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        created_at, conversation_id = _decode_cursor(cursor)
+        query = query.where(or_(
+            Conversation.created_at < created_at,
+            and_(Conversation.created_at == created_at, Conversation.id < conversation_id)
+        ))
+    rows = (await db.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # A user has few conversations, so the page itself is the validator
+    etag = _etag("conversations", current_user.id, cursor, limit, [(r.id, r.title, r.is_active, r.message_count) for r in rows])
+    if _not_modified(if_none_match, etag):
+        metrics.counter("history_not_modified_total", resource="conversations").inc()
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    _cached(response, etag)
+
+    return ConversationPage(
+        conversations=[
+            ConversationSummary(
+                id=r.id,
+                title=r.title,
+                is_active=bool(r.is_active),
+                message_count=r.message_count,
+                created_at=r.created_at
+            )
+            for r in rows
+        ],
+        next_cursor=_encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    )
+
+
+@router.get("/conversations/{conversation_id}/messages", response_model=MessagePage)
+async def get_conversation_messages(
+    conversation_id: uuid.UUID,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    before: Optional[int] = Query(default=None, ge=1),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """
+    One page of a conversation's messages, oldest first. Without ``before``
+    the newest page is returned; pass ``next_before`` to page back in time.
+    """
+    # Messages are not strictly appended: replies are filled into their
+    # placeholder after the response (possibly after the next user message),
+    # and a user message whose turn fails is deleted again. Every such change
+    # moves the count of stored (non-placeholder) rows, so that count and the
+    # highest stored seq, with the allocated seq, identify the history
+    stored = (
+        select(func.count().label("stored"), func.max(Message.seq).label("newest_stored"))
+        .where(Message.conversation_id == conversation_id, Message.stored_clause())
+        .subquery()
+    )
+    result = await db.execute(
+        select(Conversation.last_seq, stored.c.stored, stored.c.newest_stored)
+        .where(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
+    )
+    state = result.first()
+    if state is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    etag = _etag("messages", conversation_id, state.last_seq, state.stored, state.newest_stored, before, limit)
+    if _not_modified(if_none_match, etag):
+        metrics.counter("history_not_modified_total", resource="messages").inc()
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+    query = (
+        select(
+            Message.seq,
+            Message.role,
+            Message.content,
+            Message.message_type,
+            Message.confidence,
+            Message.created_at
+        )
+        .where(Message.conversation_id == conversation_id, Message.stored_clause())
+        .order_by(Message.seq.desc())
+        .limit(limit + 1)
+    )
+    if before is not None:
+        query = query.where(Message.seq < before)
+    rows = (await db.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    _cached(response, etag)
+
+    return MessagePage(
+        conversation_id=conversation_id,
+        messages=[
+            HistoryMessage(
+                seq=r.seq,
+                role=r.role,
+                content=r.content,
+                type=r.message_type or "normal",
+                confidence=r.confidence,
+                created_at=r.created_at
+            )
+            for r in rows
+        ],
+        next_before=rows[0].seq if has_more else None
+    )
@@ -12,6 +12,7 @@ from ..db.session import get_db
 from app.services.auth_service import AuthService
 from app.db.models.user import User
 from app.core.security import decode_token, verify_token_scope
+from app.services.revocation import revocation_list
 
 # Define OAuth2 scheme for Swagger UI
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
@@ -24,12 +25,19 @@ async def get_user_from_token(
     try:
         payload = decode_token(token)
         verify_token_scope(payload, "access")
+        jti = payload.get("jti")
+        if jti and await revocation_list.is_revoked(db, jti):
+            return None
         user_id_str = payload.get("sub")
         if user_id_str:
             result = await db.execute(
                 select(User).where(User.id == uuid.UUID(user_id_str))
             )
-            return result.scalar_one_or_none()
+            user = result.scalar_one_or_none()
+            # Tokens issued before the last password change are void
+            if user and payload.get("epoch", 0) != user.token_epoch:
+                return None
+            return user
     except Exception:
         return None
     return None
@@ -12,6 +12,7 @@ from pydantic import BaseModel
 from app.db.models.mood import MoodLog
 from app.db.models.user import User
 from app.db.session import get_db
+from app.db.write_behind import mood_log_writes
 from app.api.deps import get_current_user
 
 router = APIRouter()
@@ -53,21 +54,19 @@ async def get_moods(
 
 @router.post("/moods", response_model=MoodResponse)
 async def create_mood(
-    mood_data: MoodCreate, 
-    db: AsyncSession = Depends(get_db),
+    mood_data: MoodCreate,
     current_user: User = Depends(get_current_user)
 ):
     """Create new mood log for current user"""
-    mood_log = MoodLog(
-        user_id=current_user.id,
-        mood=mood_data.mood,
-        score=mood_data.score,
-        logged_date=mood_data.logged_date or date.today()
-    )
-    db.add(mood_log)
-    await db.commit()
-    await db.refresh(mood_log)
-    return mood_log
+    values = {
+        "user_id": current_user.id,
+        "mood": mood_data.mood,
+        "score": mood_data.score,
+        "logged_date": mood_data.logged_date or date.today()
+    }
+    # Group-committed with concurrent mood logs; returns once durable
+    stored = await mood_log_writes.insert(**values)
+    return MoodResponse(id=stored.id, created_at=stored.created_at, **values)
 
 
 @router.get("/moods/{mood_id}", response_model=MoodResponse)
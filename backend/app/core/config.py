@@ -13,6 +13,8 @@ class Settings(BaseSettings):
     app_name: str = "YuVA Wellness API"
     environment: str = "development"
     debug: bool = False
+    # Bearer token for /api/metrics; the endpoint is disabled while unset
+    metrics_token: str | None = None
 
     # --------------------
     # Database Configuration
@@ -25,13 +27,44 @@ class Settings(BaseSettings):
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
-    
+    # Max verified JWTs kept in memory (0 disables the cache)
+    token_cache_size: int = 4096
+    # Revoked-token Bloom filter refresh from the database
+    revocation_sync_seconds: int = 30
+    revocation_filter_capacity: int = 10000
+
+    # --------------------
+    # Rate Limiting Configuration
+    # --------------------
+    # Redis URL shared by all workers; in-process buckets are used when unset
+    rate_limit_backend_url: str | None = None
+    rate_limit_max_keys: int = 10000
+    # Reverse proxies in front of the app that append to X-Forwarded-For;
+    # 0 ignores the header and uses the peer address. The Procfile sets 1 for
+    # Render, whose load balancer is the only hop.
+    trusted_proxy_count: int = 0
+
     # --------------------
     # Authentication Configuration
     # --------------------
     google_client_id: str = "your-google-client-id.apps.googleusercontent.com"
     mail_from_name: str = "YuVA Wellness"
     mail_from_address: str = "noreply@yuva-wellness.com"
+    # Background purge of expired/used OTP codes
+    otp_purge_interval_seconds: int = 600
+    otp_purge_batch_size: int = 500
+
+    # --------------------
+    # Email Configuration
+    # --------------------
+    brevo_api_key: str | None = None
+    email_transport: str = "brevo"  # "brevo" or "stub" (logs and records locally)
+    email_outbox_poll_seconds: int = 5
+    email_outbox_batch_size: int = 50
+    email_max_concurrency: int = 5
+    email_max_attempts: int = 6
+    email_retry_base_seconds: float = 10.0
+    email_retry_max_seconds: float = 900.0
 
     # --------------------
     # CORS Configuration
@@ -62,6 +95,70 @@ class Settings(BaseSettings):
     gcp_location: str = "us-central1"
     vertex_model: str = "gemini-flash-latest"
     gemini_api_key: str | None = None
+    # More keys/projects (comma-separated); chat traffic is spread across all of them
+    gemini_api_keys: str | None = None
+    # Per-key request cap tracked locally (0 = only back off on 429)
+    gemini_key_requests_per_minute: int = 15
+    # Override the Gemini API endpoint, e.g. scripts/fake_gemini.py for load tests
+    gemini_base_url: str | None = None
+    # Chat context: messages sent to the LLM and per-worker history cache size
+    chat_history_messages: int = 20
+    chat_history_cache_conversations: int = 1000
+    # Prompt size cap (estimated tokens) for summary + recent turns + new message
+    chat_context_token_budget: int = 3000
+    # Rolling summary: condense once this many messages fall outside the recent window
+    chat_summary_batch_messages: int = 10
+    chat_summary_max_chars: int = 1500
+    # Model routing: short, early turns go to the fast model; chain is
+    # preferred -> other tier -> local responder (empty fast model disables routing)
+    llm_fast_model: str | None = "gemini-flash-lite-latest"
+    llm_route_short_chars: int = 200
+    llm_route_shallow_messages: int = 6
+    llm_route_slow_seconds: float = 6.0
+    # Assistant replies are stored after the response is sent, retried with backoff
+    chat_reply_persist_attempts: int = 8
+    chat_reply_persist_retry_seconds: float = 0.5
+    chat_reply_drain_seconds: float = 10.0
+    # Reply placeholders still pending after this long are marked unanswered
+    chat_reply_reconcile_after_seconds: int = 300
+    chat_reply_reconcile_interval_seconds: int = 60
+    chat_reply_reconcile_batch_size: int = 200
+    # Latency budgets after which chat falls back to the local responder (0 disables)
+    chat_reply_budget_seconds: float = 12.0
+    chat_first_token_budget_seconds: float = 5.0
+    # Per-model bulkhead for upstream LLM calls
+    llm_max_concurrency: int = 8
+    llm_max_queue: int = 32
+    llm_queue_timeout_seconds: float = 10.0
+    # Circuit breaker: open on quota/timeout failure rate, probe after cool-down
+    llm_breaker_window_seconds: float = 60.0
+    llm_breaker_min_calls: int = 5
+    llm_breaker_failure_rate: float = 0.5
+    llm_breaker_cooldown_seconds: float = 30.0
+    llm_breaker_max_cooldown_seconds: float = 300.0
+    # Retries of transient upstream failures, bounded by the request deadline
+    # and a retry budget shared with the circuit breaker
+    llm_retry_max_attempts: int = 3
+    llm_retry_base_delay_seconds: float = 0.25
+    llm_retry_max_delay_seconds: float = 4.0
+    llm_retry_budget_ratio: float = 0.2
+    llm_retry_budget_max_tokens: float = 10.0
+    # Cached replies for context-free openers ("hi", "hello"); size 0 disables
+    response_cache_size: int = 512
+    response_cache_ttl_seconds: float = 3600.0
+    response_cache_variants: int = 3
+    response_cache_max_prompt_chars: int = 48
+    # Group commit for high-rate inserts (chat replies, mood logs)
+    write_buffer_max_rows: int = 50
+    write_buffer_max_delay_ms: int = 10
+    write_buffer_drain_seconds: float = 10.0
+    # Streaming: coalesce tokens into writes of at least N chars or every N ms
+    stream_coalesce_chars: int = 48
+    stream_coalesce_ms: int = 50
+    # WebSocket chat: deadline for the auth frame, server heartbeat, idle cut-off
+    chat_ws_auth_timeout_seconds: float = 10.0
+    chat_ws_heartbeat_seconds: float = 25.0
+    chat_ws_idle_timeout_seconds: float = 120.0
 
     # --------------------
     # Pydantic Settings Configuration
@@ -0,0 +1,103 @@
+"""
+In-process metrics registry
+Counters, gauges and latency summaries keyed by name and labels,
+exposed as JSON on /api/metrics.
+"""
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+
+def _key(name: str, labels: Dict[str, Any]) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{rendered}}}"
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class Summary:
+    """Count/sum/max plus percentiles over the most recent observations"""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self._recent.append(value)
+
+    def percentile(self, q: float) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "max": self.max,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Tuple[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, factory, name: str, labels: Dict[str, Any]):
+        key = _key(name, labels)
+        entry = self._metrics.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._metrics.setdefault(key, (kind, factory()))
+        return entry[1]
+
+    def counter(self, name: str, **labels: Any) -> Counter:
+        return self._get("counter", Counter, name, labels)
+
+    def gauge(self, name: str, **labels: Any) -> Gauge:
+        return self._get("gauge", Gauge, name, labels)
+
+    def summary(self, name: str, **labels: Any) -> Summary:
+        return self._get("summary", Summary, name, labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {key: metric.snapshot() for key, (_, metric) in sorted(self._metrics.items())}
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,97 @@
+"""
+Precompiled multi-phrase matching
+
+Phrases are split into words and stored in a word-level trie built once, so a
+text is tokenized once and every phrase hit is found in a single left-to-right
+walk. Matching is always on whole words: "good" does not match "goodbye".
+
+Text is normalized the same way on both sides: accents and nukta dropped
+(cafe/café, ख़/ख), case folded and apostrophes removed (can't -> cant).
+Per-matcher aliases (known misspellings) are expanded into the trie when
+phrases are added, so scanning costs nothing extra for them.
+"""
+import re
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Word characters plus the Devanagari block, whose vowel signs are not \w
+_WORD_RE = re.compile(r"[\w\u0900-\u097F]+")
+_APOSTROPHES_RE = re.compile(r"['\u2019\u02bc`]")
+# Diacritics left over after NFKD: combining Latin marks and the Devanagari nukta
+_MARKS_RE = re.compile(r"[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f\u093c]")
+
+# Trie nodes are dicts keyed by word; this key (never a word) holds the labels
+_LABELS = ""
+
+
+def words(text: str) -> List[str]:
+    """Normalized words of ``text`` as the matcher sees them"""
+    if not text.isascii():
+        text = _MARKS_RE.sub("", unicodedata.normalize("NFKD", text))
+    return _WORD_RE.findall(_APOSTROPHES_RE.sub("", text.casefold()))
+
+
+def inflections(word: str) -> Tuple[str, ...]:
+    """Common English inflections: worry -> worries, worried, worrying"""
+    forms = [word, word + "s", word + "ed", word + "ing"]
+    if word.endswith("e"):
+        forms += [word + "d", word[:-1] + "ing"]
+    elif word.endswith("y"):
+        forms += [word[:-1] + "ies", word[:-1] + "ied"]
+    elif word.endswith(("s", "sh", "ch", "x")):
+        forms.append(word + "es")
+    return tuple(forms)
+
+
+class PhraseMatcher:
+    """Find which labelled phrase groups occur in a text"""
+
+    def __init__(self, aliases: Optional[Dict[str, str]] = None):
+        self._root: Dict[str, dict] = {}
+        # Canonical word -> every spelling that should match it
+        self._spellings: Dict[str, List[str]] = {}
+        for variant, word in (aliases or {}).items():
+            self._spellings.setdefault(words(word)[0], []).append(words(variant)[0])
+
+    def _forms(self, word: str, inflect: bool) -> List[str]:
+        forms = []
+        for spelling in [word, *self._spellings.get(word, ())]:
+            forms.extend(inflections(spelling) if inflect else (spelling,))
+        return forms
+
+    def add(self, label: str, phrases: Iterable[str], inflect: bool = False) -> "PhraseMatcher":
+        """
+        Register ``phrases`` under ``label``. With ``inflect`` the last word of
+        each phrase also matches its plural/past/-ing forms.
+        """
+        for phrase in phrases:
+            parts = words(phrase)
+            if not parts:
+                continue
+            nodes = [self._root]
+            for i, part in enumerate(parts):
+                forms = self._forms(part, inflect and i == len(parts) - 1)
+                nodes = [node.setdefault(form, {}) for node in nodes for form in forms]
+            for leaf in nodes:
+                leaf[_LABELS] = leaf.get(_LABELS, frozenset()) | {label}
+        return self
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        """Labels of every phrase found in ``text``"""
+        tokens = words(text)
+        root = self._root
+        hits = set()
+        for start, token in enumerate(tokens):
+            node = root.get(token)
+            if node is None:
+                continue
+            position = start
+            while node is not None:
+                labels = node.get(_LABELS)
+                if labels:
+                    hits |= labels
+                position += 1
+                if position == len(tokens):
+                    break
+                node = node.get(tokens[position])
+        return frozenset(hits)
@@ -7,14 +7,18 @@ Contains:
 - Input sanitization
 """
 import time
+import math
+import uuid
 import hashlib
+import ipaddress
+from abc import ABC, abstractmethod
 from typing import Dict, Optional, Any, Tuple
-from collections import defaultdict, deque
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from functools import lru_cache
 import logging
 
-from fastapi import HTTPException, Request, status
+from fastapi import HTTPException, Request, Response, status
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
@@ -28,6 +32,7 @@ SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 TEMP_TOKEN_EXPIRE_MINUTES = 5
+TOKEN_CACHE_SIZE = settings.token_cache_size
 
 logger = logging.getLogger(__name__)
 
@@ -151,7 +156,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire, "scope": "access"})
+    # jti lets a single token be revoked (see app.services.revocation)
+    to_encode.update({"exp": expire, "scope": "access", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -164,11 +170,29 @@ def create_temp_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Verified-claims cache: sha256(token) -> (claims, exp). Entries die with the token.
+_token_cache: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+def clear_token_cache() -> None:
+    _token_cache.clear()
+
 def decode_token(token: str) -> Dict[str, Any]:
-    """Decode and validate a JWT token."""
+    """
+    Decode and validate a JWT token.
+    Verified claims are cached until the token's ``exp`` so repeated requests
+    with the same bearer token skip signature verification and JSON parsing.
+    """
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = _token_cache.get(digest)
+    if cached is not None:
+        payload, expires_at = cached
+        if expires_at > time.time():
+            _token_cache.move_to_end(digest)
+            return dict(payload)
+        del _token_cache[digest]
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -176,6 +200,13 @@ def decode_token(token: str) -> Dict[str, Any]:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, (int, float)) and TOKEN_CACHE_SIZE > 0:
+        _token_cache[digest] = (payload, float(expires_at))
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return dict(payload)
+
 def verify_token_scope(payload: Dict[str, Any], expected_scope: str):
     """Verify that the token has the expected scope."""
     if payload.get("scope") != expected_scope:
@@ -189,56 +220,246 @@ def verify_token_scope(payload: Dict[str, Any], expected_scope: str):
 # ------------------------------------------------------------------------------
 # Rate Limiting & Input Sanitization
 # ------------------------------------------------------------------------------
+class RateLimitBackend(ABC):
+    """
+    Storage for token buckets.
+    Implementations keep a constant amount of state per key: (tokens, last_refill).
+    """
+
+    @abstractmethod
+    async def consume(self, key: str, capacity: int, refill_rate: float, cost: float = 1.0) -> Tuple[bool, float]:
+        """Refill the bucket, try to take ``cost`` tokens and return (allowed, tokens_left)"""
+
+    @abstractmethod
+    async def peek(self, key: str, capacity: int, refill_rate: float) -> float:
+        """Return the tokens currently available without consuming any"""
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process token buckets with LRU eviction of idle identifiers"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def _refill(self, key: str, capacity: int, refill_rate: float, now: float) -> float:
+        state = self._buckets.get(key)
+        if state is None:
+            return float(capacity)
+        tokens, updated_at = state
+        return min(float(capacity), tokens + (now - updated_at) * refill_rate)
+
+    async def consume(self, key: str, capacity: int, refill_rate: float, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens = self._refill(key, capacity, refill_rate, now)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            # Least recently seen identifier; a full bucket is indistinguishable from a missing one
+            self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    async def peek(self, key: str, capacity: int, refill_rate: float) -> float:
+        return self._refill(key, capacity, refill_rate, time.monotonic())
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets shared by every worker through Redis.
+    The refill and take happen atomically in a Lua script, and each key expires
+    once it would have refilled completely, so idle identifiers cost nothing.
+    Falls back to the in-memory backend if Redis is unavailable.
+    """
+
+    _SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    if cost > 0 then
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+        redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    end
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str, fallback: Optional[RateLimitBackend] = None):
+        self.url = url
+        self.fallback = fallback or InMemoryRateLimitBackend()
+        self._script = None
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            # Resolved once: every worker keeps its own buckets from here on
+            logger.error("RATE_LIMIT_BACKEND_URL is set but the redis package is not installed; "
+                         "rate limits are per process")
+            return
+        # Connections are opened lazily, on the first command
+        self._script = redis.from_url(url).register_script(self._SCRIPT)
+
+    async def _run(self, key: str, capacity: int, refill_rate: float, cost: float) -> Tuple[bool, float]:
+        allowed, tokens = await self._script(
+            keys=[f"ratelimit:{key}"],
+            args=[capacity, refill_rate, time.time(), cost]
+        )
+        return bool(int(allowed)), float(tokens)
+
+    async def consume(self, key: str, capacity: int, refill_rate: float, cost: float = 1.0) -> Tuple[bool, float]:
+        if self._script is not None:
+            try:
+                return await self._run(key, capacity, refill_rate, cost)
+            except Exception as e:
+                logger.error(f"Redis rate limit backend failed, using local buckets: {str(e)}")
+        return await self.fallback.consume(key, capacity, refill_rate, cost)
+
+    async def peek(self, key: str, capacity: int, refill_rate: float) -> float:
+        if self._script is not None:
+            try:
+                _, tokens = await self._run(key, capacity, refill_rate, 0)
+                return tokens
+            except Exception as e:
+                logger.error(f"Redis rate limit backend failed, using local buckets: {str(e)}")
+        return await self.fallback.peek(key, capacity, refill_rate)
+
+
+@lru_cache(maxsize=1)
+def get_rate_limit_backend() -> RateLimitBackend:
+    """Get the shared rate limit backend (Redis if configured, else in-process)"""
+    local = InMemoryRateLimitBackend(max_keys=settings.rate_limit_max_keys)
+    if settings.rate_limit_backend_url:
+        return RedisRateLimitBackend(settings.rate_limit_backend_url, fallback=local)
+    return local
+
+
 class RateLimiter:
-    """Simple in-memory rate limiter"""
-    
-    def __init__(self, max_requests: int = 100, window_seconds: int = 3600):
+    """
+    Token-bucket rate limiter.
+    Allows bursts of up to ``max_requests`` and refills at
+    ``max_requests / window_seconds`` tokens per second.
+    """
+
+    def __init__(
+        self,
+        max_requests: int = 100,
+        window_seconds: int = 3600,
+        name: str = "api",
+        backend: Optional[RateLimitBackend] = None
+    ):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: Dict[str, deque] = defaultdict(deque)
-    
-    def is_allowed(self, identifier: str) -> bool:
-        now = time.time()
-        window_start = now - self.window_seconds
-        
-        user_requests = self.requests[identifier]
-        while user_requests and user_requests[0] < window_start:
-            user_requests.popleft()
-        
-        if len(user_requests) >= self.max_requests:
-            return False
-        
-        user_requests.append(now)
-        return True
-    
-    def get_remaining(self, identifier: str) -> int:
-        return max(0, self.max_requests - len(self.requests[identifier]))
+        self.name = name
+        self.refill_rate = max_requests / window_seconds
+        self._backend = backend
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        return self._backend or get_rate_limit_backend()
+
+    def _key(self, identifier: str) -> str:
+        return f"{self.name}:{identifier}"
+
+    async def hit(self, identifier: str) -> Tuple[bool, int, int]:
+        """Consume one request. Returns (allowed, remaining, retry_after_seconds)"""
+        allowed, tokens = await self.backend.consume(
+            self._key(identifier), self.max_requests, self.refill_rate
+        )
+        retry_after = 0 if allowed else max(1, math.ceil((1 - tokens) / self.refill_rate))
+        return allowed, int(tokens), retry_after
+
+    async def is_allowed(self, identifier: str) -> bool:
+        allowed, _, _ = await self.hit(identifier)
+        return allowed
+
+    async def get_remaining(self, identifier: str) -> int:
+        tokens = await self.backend.peek(self._key(identifier), self.max_requests, self.refill_rate)
+        return int(tokens)
+
+# Global instances (per-route policies)
+api_limiter = RateLimiter(max_requests=100, window_seconds=3600, name="api")
+chat_limiter = RateLimiter(max_requests=50, window_seconds=3600, name="chat")
+login_limiter = RateLimiter(max_requests=10, window_seconds=900, name="login")
+otp_limiter = RateLimiter(max_requests=5, window_seconds=900, name="otp")
+
+_proxy_warning_logged = False
+
+
+def _is_private(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(host).is_private
+    except ValueError:
+        return False
 
-# Global instances
-api_limiter = RateLimiter(max_requests=100, window_seconds=3600)
-chat_limiter = RateLimiter(max_requests=50, window_seconds=3600)
 
 def get_client_ip(request: Request) -> str:
-    """Get client IP address from request"""
-    forwarded = request.headers.get("X-Forwarded-For")
-    if forwarded:
-        return forwarded.split(",")[0].strip()
-    return request.client.host if request.client else "unknown"
+    """
+    Get client IP address from request.
+    X-Forwarded-For is only trusted behind ``trusted_proxy_count`` proxies: each
+    appends the address it saw, so the client is that many entries from the
+    right and anything further left was supplied by the client itself.
+    """
+    global _proxy_warning_logged
+    hops = settings.trusted_proxy_count
+    peer = request.client.host if request.client else "unknown"
+    if hops > 0:
+        forwarded = [
+            hop.strip()
+            for header in request.headers.getlist("X-Forwarded-For")
+            for hop in header.split(",")
+            if hop.strip()
+        ]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    elif not _proxy_warning_logged and "X-Forwarded-For" in request.headers and _is_private(peer):
+        # Forwarded traffic from a private peer is almost certainly a reverse
+        # proxy: every client would share its address and its rate-limit buckets
+        _proxy_warning_logged = True
+        logger.error(
+            f"Request from private address {peer} carries X-Forwarded-For but TRUSTED_PROXY_COUNT is 0; "
+            "all clients are rate limited as one. Set TRUSTED_PROXY_COUNT to the number of proxies in front of the app"
+        )
+    return peer
 
-def check_rate_limit(request: Request, limiter: RateLimiter = api_limiter):
+async def check_rate_limit(request: Request, limiter: RateLimiter = api_limiter) -> int:
     """Check rate limit for request"""
     client_ip = get_client_ip(request)
     
-    if not limiter.is_allowed(client_ip):
+    allowed, remaining, retry_after = await limiter.hit(client_ip)
+    if not allowed:
         raise HTTPException(
             status_code=429,
             detail={
                 "error": "Rate limit exceeded",
                 "message": "Too many requests. Please try again later.",
-                "retry_after": limiter.window_seconds
-            }
+                "retry_after": retry_after
+            },
+            headers={"Retry-After": str(retry_after)}
         )
-    return limiter.get_remaining(client_ip)
+    return remaining
+
+def rate_limit(limiter: RateLimiter = api_limiter):
+    """
+    Build a route dependency enforcing a rate limit policy, e.g.
+    ``@router.post("/login", dependencies=[Depends(rate_limit(login_limiter))])``
+    """
+    async def dependency(request: Request, response: Response) -> int:
+        remaining = await check_rate_limit(request, limiter)
+        response.headers["X-RateLimit-Limit"] = str(limiter.max_requests)
+        response.headers["X-RateLimit-Remaining"] = str(remaining)
+        return remaining
+    return dependency
 
 def sanitize_input(text: str, max_length: int = 10000) -> str:
     """Basic input sanitization"""
@@ -0,0 +1,45 @@
+"""
+Single-flight request coalescing
+Concurrent calls that share a key wait for one execution and all receive its
+result (or its exception). Nothing is cached once the call completes.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.core.metrics import metrics
+
+
+class SingleFlight:
+    """Deduplicate concurrent in-process calls by key"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        existing = self._calls.get(key)
+        if existing is not None:
+            metrics.counter("singleflight_shared_total", flight=self.name).inc()
+            # Shield so a disconnecting follower does not cancel the leader's work
+            return await asyncio.shield(existing)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so an unshared failure is not logged as never retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._calls.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,87 @@
+"""
+In-process periodic background jobs
+Jobs are registered at import time and started/stopped with the application.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Run an async callable every ``interval_seconds`` until stopped"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        interval_seconds: float,
+        initial_delay: float = 0.0
+    ):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.initial_delay = initial_delay
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    def trigger(self) -> None:
+        """Run the job now instead of waiting for the rest of the interval"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        self._wakeup = asyncio.Event()
+        if self.initial_delay:
+            await asyncio.sleep(self.initial_delay)
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Periodic task '{self.name}' failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+_tasks: List[PeriodicTask] = []
+
+
+def register_periodic_task(task: PeriodicTask) -> PeriodicTask:
+    """Register a job to be started with the application"""
+    _tasks.append(task)
+    return task
+
+
+def start_periodic_tasks() -> None:
+    for task in _tasks:
+        task.start()
+        logger.info(f"Started periodic task '{task.name}' (every {task.interval_seconds}s)")
+
+
+async def stop_periodic_tasks() -> None:
+    for task in _tasks:
+        await task.stop()
@@ -0,0 +1,20 @@
+"""
+Fast local token estimation
+
+Good enough to budget prompt size without calling the tokenizer API: English
+averages about four characters per token, and every word or punctuation mark
+costs at least one.
+"""
+import re
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+# Role/turn framing the model adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of LLM tokens in ``text``"""
+    if not text:
+        return 0
+    return max(len(_PIECE_RE.findall(text)), (len(text) + 3) // 4)
@@ -7,3 +7,5 @@ from app.db.models.otp import OTP
 from app.db.models.mood import MoodLog
 from app.db.models.journal import JournalEntry
 from app.db.models.assessment import AssessmentResult
+from app.db.models.email_outbox import EmailOutbox
+from app.db.models.revoked_token import RevokedToken
@@ -6,3 +6,5 @@ from .mood import MoodLog
 from .journal import JournalEntry
 from .assessment import AssessmentResult
 from .chat import Conversation, Message
+from .email_outbox import EmailOutbox
+from .revoked_token import RevokedToken
@@ -1,11 +1,12 @@
 import uuid
 from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import String, Text, Boolean, DateTime, ForeignKey, Float
+from sqlalchemy import String, Text, Boolean, DateTime, ForeignKey, Float, Integer, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 
 from app.db.base_class import Base
+from app.core.tokens import estimate_tokens
 
 class Conversation(Base):
     """
@@ -27,41 +28,84 @@ class Conversation(Base):
     # Active flag (for logical deletion or archiving)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
 
+    # Highest message sequence number handed out in this conversation
+    last_seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    # Rolling summary of messages 1..summary_through_seq (see services.conversation_memory)
+    summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    summary_through_seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
     # Relationship to messages
     messages: Mapped[List["Message"]] = relationship(
         "Message", 
         back_populates="conversation", 
         cascade="all, delete-orphan",
-        order_by="Message.created_at"
+        order_by="Message.seq"
     )
 
+# message_type of an assistant row reserved with the user message and not yet
+# filled in with the reply (see services.chat_persistence)
+PENDING_REPLY_TYPE = "pending"
+
+
 class Message(Base):
     """
     Represents a single message in a conversation.
     """
     __tablename__ = "messages"
+    __table_args__ = (
+        # Serves "last N messages of a conversation" and guarantees a total order
+        Index("ix_messages_conversation_id_seq", "conversation_id", "seq", unique=True),
+        # Client retries with the same Idempotency-Key map back to one stored turn
+        Index("ix_messages_conversation_id_idempotency_key", "conversation_id", "idempotency_key", unique=True),
+        # Only the few unfilled reply placeholders, for the reconciliation job
+        Index(
+            "ix_messages_pending_created_at",
+            "created_at",
+            postgresql_where=text(f"message_type = '{PENDING_REPLY_TYPE}'"),
+            sqlite_where=text(f"message_type = '{PENDING_REPLY_TYPE}'")
+        ),
+    )
 
     conversation_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("conversations.id", ondelete="CASCADE"),
-        nullable=False,
-        index=True
+        nullable=False
     )
 
+    # Monotonic position within the conversation (see services.chat_history.allocate_seq)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)
+
     # 'user' or 'assistant'
     role: Mapped[str] = mapped_column(String(20), nullable=False)
     
     # The actual text content
     content: Mapped[str] = mapped_column(Text, nullable=False)
 
+    # Approximate LLM tokens in content, filled at insert time for context budgeting
+    token_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=lambda ctx: estimate_tokens(ctx.get_current_parameters()["content"]),
+        server_default="0"
+    )
+
     # For AI responses: normal, crisis, error, etc.
     message_type: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     
     # For AI responses: confidence score
     confidence: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
 
+    # For user messages: the client's Idempotency-Key, if one was sent
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
     # Relationship back to conversation
     conversation: Mapped["Conversation"] = relationship(
         "Conversation", 
         back_populates="messages"
     )
+
+    @classmethod
+    def stored_clause(cls):
+        """Messages with content: excludes reply placeholders not filled in yet"""
+        return cls.message_type.is_distinct_from(PENDING_REPLY_TYPE)
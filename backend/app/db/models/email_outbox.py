@@ -0,0 +1,37 @@
+"""
+Email outbox model for asynchronous delivery
+"""
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Text, Integer, DateTime, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+
+class EmailOutbox(Base):
+    """
+    Queued outgoing email.
+    Request handlers insert rows; the outbox worker delivers them with retries.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    to_email: Mapped[str] = mapped_column(String(255), nullable=False)
+    subject: Mapped[str] = mapped_column(String(255), nullable=False)
+    html_content: Mapped[str] = mapped_column(Text, nullable=False)
+    text_content: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # pending -> sending -> sent | failed
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        comment="Earliest retry time, or lease expiry while sending"
+    )
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -2,16 +2,23 @@
 OTP Model for 2-step authentication
 """
 import uuid
-from datetime import datetime, timedelta
-from sqlalchemy import String, DateTime, ForeignKey, Boolean, Integer
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import String, DateTime, ForeignKey, Boolean, Integer, Index, and_
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 
 from app.db.base_class import Base
 
+MAX_OTP_ATTEMPTS = 5
+
 class OTP(Base):
     """One-Time Password model for 2FA"""
     __tablename__ = "otp_codes"
+    __table_args__ = (
+        # Serves the per-email validity lookup and the expiry purge
+        Index("ix_otp_codes_email_expires_at", "email", "expires_at"),
+    )
 
     user_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -29,5 +36,20 @@ class OTP(Base):
     
     def is_valid(self) -> bool:
         """Check if OTP is valid (not used, not expired, attempts < 5)"""
-        from datetime import timezone
-        return not self.is_used and self.attempts < 5 and self.expires_at > datetime.now(timezone.utc)
+        return not self.is_used and self.attempts < MAX_OTP_ATTEMPTS and self.expires_at > datetime.now(timezone.utc)
+
+    @classmethod
+    def valid_clause(cls, now: Optional[datetime] = None):
+        """SQL equivalent of is_valid() so stale rows are filtered in the query"""
+        now = now or datetime.now(timezone.utc)
+        return and_(
+            cls.is_used == False,
+            cls.attempts < MAX_OTP_ATTEMPTS,
+            cls.expires_at > now
+        )
+
+    @classmethod
+    def stale_clause(cls, now: Optional[datetime] = None):
+        """Rows that can never validate again and are safe to delete"""
+        now = now or datetime.now(timezone.utc)
+        return (cls.is_used == True) | (cls.attempts >= MAX_OTP_ATTEMPTS) | (cls.expires_at <= now)
@@ -4,7 +4,7 @@ Authentication models for YuVA Wellness
 import uuid
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Boolean, DateTime, func
+from sqlalchemy import String, Boolean, DateTime, Integer, func
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -105,6 +105,14 @@ class User(Base):
         comment="Account active status"
     )
     
+    token_epoch: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Bumped on password change to invalidate previously issued tokens"
+    )
+    
     # Timestamps
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -0,0 +1,187 @@
+"""
+Group-commit write-behind buffers for high-rate inserts
+
+Rows handed to a buffer by concurrent requests are collected and written as
+one multi-row INSERT ... RETURNING in a single transaction, flushed when
+``write_buffer_max_rows`` are waiting or ``write_buffer_max_delay_ms`` after
+the first one arrived. ``insert`` returns only once the row's batch has
+committed, so callers keep their durability guarantee while the database sees
+one round-trip per batch instead of one per row (and, with NullPool, one
+connection per batch).
+
+If a batch fails on a constraint or data error, its rows are retried one by
+one so only the offending caller sees the error; any other failure (e.g. the
+database is unreachable) is raised to every caller in the batch.
+
+A buffer built with ``upsert_on`` writes INSERT ... ON CONFLICT DO UPDATE on
+those columns, so a row can fill in a placeholder inserted earlier (and a
+retried write is a harmless overwrite with the same values).
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.db.base_class import Base
+from app.db.models.chat import Message
+from app.db.models.mood import MoodLog
+from app.db.session import get_async_session_local
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_Pending = Tuple[Dict[str, Any], asyncio.Future]
+
+
+class WriteBehindBuffer:
+    """Batch inserts into one table and acknowledge each row once committed"""
+
+    def __init__(
+        self,
+        model: Type[Base],
+        max_rows: Optional[int] = None,
+        max_delay: Optional[float] = None,
+        returning: Sequence[str] = ("id", "created_at"),
+        session_factory: Optional[Callable[[], async_sessionmaker]] = None,
+        max_concurrent_flushes: int = 4,
+        upsert_on: Sequence[str] = ()
+    ):
+        self.model = model
+        self.upsert_on = tuple(upsert_on)
+        self.table = model.__table__
+        self.max_rows = max_rows or settings.write_buffer_max_rows
+        self.max_delay = settings.write_buffer_max_delay_ms / 1000 if max_delay is None else max_delay
+        self._returning = [self.table.c[name] for name in returning]
+        self._session_factory = session_factory or get_async_session_local
+        self._flush_slots = asyncio.Semaphore(max_concurrent_flushes)
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: set = set()
+        self._closed = False
+
+    async def insert(self, **values: Any) -> Row:
+        """Queue one row and wait until it is committed; returns the RETURNING columns"""
+        if self._closed:
+            raise RuntimeError(f"Write buffer for {self.table.name} is closed")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((values, future))
+        metrics.gauge("write_buffer_pending", table=self.table.name).set(len(self._pending))
+        if len(self._pending) >= self.max_rows:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._start_flush)
+        # A cancelled caller does not withdraw its row; it is still written
+        return await asyncio.shield(future)
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_rows], self._pending[self.max_rows:]
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        metrics.gauge("write_buffer_pending", table=self.table.name).set(0)
+
+    async def _flush(self, batch: List[_Pending]) -> None:
+        async with self._flush_slots:
+            started = time.perf_counter()
+            try:
+                rows = await self._write([values for values, _ in batch])
+            except (IntegrityError, DataError) as e:
+                if len(batch) == 1:
+                    self._settle(batch, error=e)
+                    return
+                logger.warning(f"Batch insert into {self.table.name} failed ({type(e).__name__}); retrying rows one by one")
+                for item in batch:
+                    await self._flush_one(item)
+                return
+            except Exception as e:
+                logger.error(f"Batch insert of {len(batch)} rows into {self.table.name} failed: {str(e)}")
+                self._settle(batch, error=e)
+                return
+            metrics.summary("write_buffer_batch_rows", table=self.table.name).observe(len(batch))
+            metrics.summary("write_buffer_flush_seconds", table=self.table.name).observe(time.perf_counter() - started)
+            self._settle(batch, rows=rows)
+
+    async def _flush_one(self, item: _Pending) -> None:
+        try:
+            rows = await self._write([item[0]])
+        except Exception as e:
+            self._settle([item], error=e)
+        else:
+            self._settle([item], rows=rows)
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> List[Row]:
+        """Insert ``rows`` in one transaction; RETURNING rows come back in input order"""
+        # executemany needs the same columns in every row, so group by column set
+        groups: Dict[frozenset, List[int]] = {}
+        for i, values in enumerate(rows):
+            groups.setdefault(frozenset(values), []).append(i)
+        returned: List[Optional[Row]] = [None] * len(rows)
+        session_local = self._session_factory()
+        async with session_local() as session:
+            dialect = session.get_bind().dialect.name
+            for columns, indexes in groups.items():
+                statement = self._statement(dialect, columns)
+                result = await session.execute(statement, [rows[i] for i in indexes])
+                for i, row in zip(indexes, result.all()):
+                    returned[i] = row
+            await session.commit()
+        return returned
+
+    def _statement(self, dialect: str, columns: frozenset):
+        if not self.upsert_on:
+            return insert(self.model).returning(*self._returning, sort_by_parameter_order=True)
+        if dialect == "postgresql":
+            statement = postgresql.insert(self.model)
+        elif dialect == "sqlite":
+            statement = sqlite.insert(self.model)
+        else:
+            raise NotImplementedError(f"Upserts into {self.table.name} are not supported on {dialect}")
+        statement = statement.on_conflict_do_update(
+            index_elements=list(self.upsert_on),
+            set_={name: statement.excluded[name] for name in columns if name not in self.upsert_on}
+        )
+        return statement.returning(*self._returning, sort_by_parameter_order=True)
+
+    @staticmethod
+    def _settle(batch: List[_Pending], rows: Optional[List[Row]] = None, error: Optional[BaseException] = None) -> None:
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+                # Nobody may be left awaiting a cancelled caller's row
+                future.exception()
+            else:
+                future.set_result(rows[i])
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """Flush everything queued and wait for in-flight batches"""
+        self._closed = True
+        self._start_flush()
+        if self._flushes:
+            _, not_done = await asyncio.wait(set(self._flushes), timeout=timeout)
+            if not_done:
+                logger.error(f"{len(not_done)} batches for {self.table.name} did not finish before shutdown")
+
+
+# Assistant replies fill in the placeholder reserved with the user message
+message_writes = WriteBehindBuffer(Message, upsert_on=("conversation_id", "seq"))
+mood_log_writes = WriteBehindBuffer(MoodLog)
+
+
+async def drain_write_buffers(timeout: Optional[float] = None) -> None:
+    """Flush all buffers, e.g. on shutdown"""
+    timeout = settings.write_buffer_drain_seconds if timeout is None else timeout
+    await asyncio.gather(message_writes.drain(timeout), mood_log_writes.drain(timeout))
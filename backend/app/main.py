@@ -2,14 +2,24 @@
 YuVA Wellness - API-Only Backend
 FastAPI backend for mental health web application
 """
-from fastapi import FastAPI
+import hmac
+from typing import Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import chat, journal, analytics, ai_features, mood, resources, ai
+from app.api import chat, journal, analytics, ai_features, mood, resources, ai, conversations
 from app.api.auth import router as auth_router
 import logging
 from app.middleware import ErrorHandlingMiddleware, LoggingMiddleware
 from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.tasks import start_periodic_tasks, stop_periodic_tasks
+# Imported for their periodic task registrations
+from app.services import otp_service, revocation  # noqa: F401
+from app.db.write_behind import drain_write_buffers
+from app.services.chat_persistence import drain_pending_replies
+from app.services.email_service import close_email_transport
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +57,7 @@ app.include_router(chat.router, prefix="/api")
 app.include_router(analytics.router, prefix="/api")
 app.include_router(ai_features.router, prefix="/api")
 app.include_router(ai.router, prefix="/api/ai")
+app.include_router(conversations.router, prefix="/api/ai")
 
 @app.get("/")
 async def root():
@@ -64,6 +75,19 @@ async def health_check():
     """Health check endpoint for monitoring"""
     return {"status": "ok"}
 
+def require_metrics_token(authorization: Optional[str] = Header(default=None)) -> None:
+    """Metrics expose limiter, breaker and queue state: operators only"""
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.metrics_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+
+@app.get("/api/metrics", dependencies=[Depends(require_metrics_token)], include_in_schema=False)
+async def api_metrics():
+    """In-process performance metrics for this worker"""
+    return metrics.snapshot()
+
 @app.get("/api/status")
 async def api_status():
     """API status with database connectivity check"""
@@ -80,13 +104,13 @@ async def api_status():
             
             # Check tables
             try:
-                await session.execute(text("SELECT count(*) FROM users"))
+                await session.execute(text("SELECT 1 FROM users LIMIT 1"))
                 users_table = "ok"
             except:
                 users_table = "missing"
                 
             try:
-                await session.execute(text("SELECT count(*) FROM otp_codes"))
+                await session.execute(text("SELECT 1 FROM otp_codes LIMIT 1"))
                 otp_table = "ok"
             except:
                 otp_table = "missing"
@@ -141,4 +165,13 @@ async def on_startup():
             pass
         logger.info("Database tables initialized successfully.")
     except Exception as e:
-        logger.error(f"Failed to initialize database tables: {str(e)}")
\ No newline at end of file
+        logger.error(f"Failed to initialize database tables: {str(e)}")
+    start_periodic_tasks()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Application shutdown"""
+    await drain_pending_replies()
+    await drain_write_buffers()
+    await stop_periodic_tasks()
+    await close_email_transport()
@@ -248,6 +248,7 @@ class AuthService:
 
         user.password_hash = hash_password(new_password)
         user.provider = "local" # Ensure they can always login with local password now
+        user.token_epoch += 1 # Revoke all previously issued access tokens
         await db.commit()
         return True, "Password updated successfully"
 
@@ -273,6 +274,7 @@ class AuthService:
         
         user.password_hash = hash_password(new_password)
         user.provider = "local"
+        user.token_epoch += 1 # Revoke all previously issued access tokens
         await db.commit()
         return True, "Password reset successfully"
 
@@ -0,0 +1,150 @@
+"""
+Chat history access
+
+Messages carry a per-conversation sequence number allocated atomically from
+``Conversation.last_seq``, so ordering is total even when several messages
+share a timestamp. Recent turns are read with an index-backed
+"ORDER BY seq DESC LIMIT N" query, and each worker keeps a bounded ring buffer
+of recent turns per active conversation so most turns read no history at all.
+"""
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.tokens import estimate_tokens
+from app.db.models.chat import Conversation, Message
+
+settings = get_settings()
+
+
+@dataclass
+class HistoryTurn:
+    seq: int
+    role: str
+    content: str
+    token_count: int = 0
+
+    def as_message(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+
+class _CachedConversation:
+    __slots__ = ("turns", "last_seq")
+
+    def __init__(self, max_turns: int):
+        self.turns: Deque[HistoryTurn] = deque(maxlen=max_turns)
+        self.last_seq = 0
+
+
+class ConversationHistoryCache:
+    """
+    Per-worker LRU of recent turns for active conversations.
+    An entry is only trusted while it is contiguous: appending a turn whose seq
+    is not ``last_seq + 1`` (another worker wrote in between, or a write was
+    rolled back) drops the entry and the next read goes to the database.
+    """
+
+    def __init__(self, max_conversations: int = 1000, max_turns: int = 40):
+        self.max_conversations = max_conversations
+        self.max_turns = max_turns
+        self._entries: "OrderedDict[uuid.UUID, _CachedConversation]" = OrderedDict()
+
+    def get(self, conversation_id: uuid.UUID, through_seq: int) -> Optional[List[HistoryTurn]]:
+        """Cached turns if the cache is current up to and including ``through_seq``"""
+        entry = self._entries.get(conversation_id)
+        if entry is None or entry.last_seq != through_seq:
+            return None
+        self._entries.move_to_end(conversation_id)
+        return list(entry.turns)
+
+    def put(self, conversation_id: uuid.UUID, turns: List[HistoryTurn]) -> None:
+        entry = _CachedConversation(self.max_turns)
+        entry.turns.extend(turns)
+        entry.last_seq = turns[-1].seq if turns else 0
+        self._entries[conversation_id] = entry
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self.max_conversations:
+            self._entries.popitem(last=False)
+
+    def append(self, conversation_id: uuid.UUID, turn: HistoryTurn) -> None:
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return
+        if turn.seq != entry.last_seq + 1:
+            self.invalidate(conversation_id)
+            return
+        entry.turns.append(turn)
+        entry.last_seq = turn.seq
+
+    def invalidate(self, conversation_id: uuid.UUID) -> None:
+        self._entries.pop(conversation_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+history_cache = ConversationHistoryCache(
+    max_conversations=settings.chat_history_cache_conversations,
+    max_turns=max(settings.chat_history_messages, 1)
+)
+
+
+async def allocate_seq(db: AsyncSession, conversation_id: uuid.UUID, count: int = 1) -> int:
+    """
+    Reserve ``count`` consecutive sequence numbers and return the first.
+    The increment is a single UPDATE ... RETURNING, so concurrent writers never collide.
+    """
+    result = await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(last_seq=Conversation.last_seq + count)
+        .returning(Conversation.last_seq)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one() - count + 1
+
+
+async def get_recent_turns(
+    db: AsyncSession,
+    conversation_id: uuid.UUID,
+    through_seq: int,
+    limit: Optional[int] = None
+) -> List[HistoryTurn]:
+    """Last ``limit`` turns up to ``through_seq`` (inclusive), oldest first"""
+    limit = limit or settings.chat_history_messages
+    cached = history_cache.get(conversation_id, through_seq)
+    if cached is not None:
+        metrics.counter("chat_history_cache_total", result="hit").inc()
+        return cached[-limit:]
+
+    metrics.counter("chat_history_cache_total", result="miss").inc()
+    result = await db.execute(
+        select(Message.seq, Message.role, Message.content, Message.token_count)
+        .where(Message.conversation_id == conversation_id, Message.seq <= through_seq, Message.stored_clause())
+        .order_by(Message.seq.desc())
+        .limit(max(limit, history_cache.max_turns))
+    )
+    turns = [
+        HistoryTurn(seq=row.seq, role=row.role, content=row.content, token_count=row.token_count)
+        for row in result
+    ]
+    turns.reverse()
+    if turns and turns[-1].seq == through_seq:
+        history_cache.put(conversation_id, turns)
+    return turns[-limit:]
+
+
+def record_turn(conversation_id: uuid.UUID, message: Message) -> None:
+    """Keep the ring buffer in step with a message that was just written"""
+    history_cache.append(conversation_id, HistoryTurn(
+        seq=message.seq,
+        role=message.role,
+        content=message.content,
+        token_count=message.token_count or estimate_tokens(message.content)
+    ))
@@ -0,0 +1,220 @@
+"""
+Post-response persistence of assistant replies
+
+Chat endpoints commit the user's message in a short transaction before the
+LLM is called, so no transaction or pooled connection is held while the model
+works. The same transaction inserts a placeholder assistant row (type
+``pending``) at the reply's position: from the moment the turn is
+acknowledged, the database records that it is owed an answer.
+
+The finished reply is handed over here and written through the group-commit
+message buffer after the response has gone out, as an upsert that fills in
+the placeholder. Failed writes are retried with backoff; a retry of a write
+that had in fact committed just overwrites the row with the same values.
+
+A placeholder that is still pending after ``chat_reply_reconcile_after_seconds``
+lost its reply: the worker died before storing it, storage kept failing, or
+the stream broke off before any text. The reconciliation job turns such rows
+into an ``unanswered`` notice, so every acknowledged turn ends with an
+assistant row and no turn is silently left without one.
+
+Replies not yet stored can be read back with ``pending_reply`` (idempotent
+retries of the same turn) and are drained on shutdown. Readers of the history
+skip ``pending`` rows (``Message.stored_clause()``).
+"""
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.tasks import PeriodicTask, register_periodic_task
+from app.core.tokens import estimate_tokens
+from app.db.models.chat import PENDING_REPLY_TYPE, Message
+from app.db.session import get_async_session_local
+from app.db.write_behind import message_writes
+from app.services.chat_history import history_cache, record_turn
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# message_type the reconciliation job gives a reply that was lost
+UNANSWERED_REPLY_TYPE = "unanswered"
+UNANSWERED_REPLY = (
+    "I wasn't able to finish my reply to this message. "
+    "If you'd still like an answer, please send it again."
+)
+
+
+def reply_placeholder(conversation_id: uuid.UUID, seq: int) -> Message:
+    """Assistant row to add in the user message's transaction; ``persist_reply`` fills it in"""
+    return Message(
+        conversation_id=conversation_id,
+        seq=seq,
+        role="assistant",
+        content="",
+        message_type=PENDING_REPLY_TYPE,
+        token_count=0
+    )
+
+
+@dataclass
+class PendingReply:
+    content: str
+    message_type: str
+    confidence: float
+
+
+_pending: Dict[Tuple[uuid.UUID, int], PendingReply] = {}
+# Strong references so in-flight writes are not garbage collected
+_tasks: Set[asyncio.Task] = set()
+
+
+def pending_reply(conversation_id: uuid.UUID, seq: int) -> Optional[PendingReply]:
+    """A reply handed over for storage on this worker but not yet committed"""
+    return _pending.get((conversation_id, seq))
+
+
+def persist_reply(
+    conversation_id: uuid.UUID,
+    seq: int,
+    content: str,
+    message_type: str,
+    confidence: float,
+    then: Optional[Callable[[], Awaitable[None]]] = None
+) -> None:
+    """
+    Store an assistant reply in the background. The history cache is updated
+    right away so the next turn sees it; ``then`` runs once the row is stored.
+    """
+    reply = PendingReply(content, message_type, confidence)
+    _pending[(conversation_id, seq)] = reply
+    metrics.gauge("chat_replies_pending").set(len(_pending))
+    record_turn(conversation_id, Message(**_columns(conversation_id, seq, reply)))
+    # A fresh task: the caller may be a generator closing inside a cancelled scope
+    task = asyncio.create_task(_store(conversation_id, seq, reply, then))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _columns(conversation_id: uuid.UUID, seq: int, reply: PendingReply) -> dict:
+    return {
+        "conversation_id": conversation_id,
+        "seq": seq,
+        "role": "assistant",
+        "content": reply.content,
+        "message_type": reply.message_type,
+        "confidence": reply.confidence,
+        # Python-side defaults are not applied to the placeholder on conflict
+        "token_count": estimate_tokens(reply.content)
+    }
+
+
+async def _store(
+    conversation_id: uuid.UUID,
+    seq: int,
+    reply: PendingReply,
+    then: Optional[Callable[[], Awaitable[None]]]
+) -> None:
+    attempts = max(settings.chat_reply_persist_attempts, 1)
+    try:
+        for attempt in range(1, attempts + 1):
+            try:
+                await message_writes.insert(**_columns(conversation_id, seq, reply))
+                break
+            except IntegrityError as e:
+                # Not retryable, e.g. the conversation was deleted meanwhile
+                logger.error(f"Reply {seq} for conversation {conversation_id} cannot be stored: {str(e)}")
+                history_cache.invalidate(conversation_id)
+                return
+            except Exception as e:
+                if attempt == attempts:
+                    # The placeholder stays pending and is reconciled later
+                    logger.error(
+                        f"Giving up on storing reply {seq} for conversation {conversation_id} "
+                        f"after {attempts} attempts: {str(e)}"
+                    )
+                    metrics.counter("chat_reply_persist_failed_total").inc()
+                    history_cache.invalidate(conversation_id)
+                    return
+                metrics.counter("chat_reply_persist_retries_total").inc()
+                delay = min(settings.chat_reply_persist_retry_seconds * 2 ** (attempt - 1), 30.0)
+                logger.warning(f"Storing reply for conversation {conversation_id} failed ({str(e)}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    finally:
+        _pending.pop((conversation_id, seq), None)
+        metrics.gauge("chat_replies_pending").set(len(_pending))
+
+    if then is not None:
+        try:
+            await then()
+        except Exception:
+            logger.exception(f"Post-store work failed for conversation {conversation_id}")
+
+
+async def drain_pending_replies(timeout: Optional[float] = None) -> None:
+    """Wait for in-flight reply writes, e.g. on shutdown"""
+    if not _tasks:
+        return
+    timeout = settings.chat_reply_drain_seconds if timeout is None else timeout
+    logger.info(f"Waiting for {len(_pending)} pending chat replies to be stored")
+    _, not_done = await asyncio.wait(set(_tasks), timeout=timeout)
+    if not_done:
+        logger.error(f"{len(_pending)} chat replies were not stored before shutdown")
+
+
+async def reconcile_lost_replies(db: AsyncSession, older_than: timedelta, batch_size: int) -> int:
+    """
+    Turn reply placeholders still pending after ``older_than`` into an
+    ``unanswered`` notice. Returns the number of turns reconciled.
+    """
+    cutoff = datetime.now(timezone.utc) - older_than
+    lost_ids = (
+        select(Message.id)
+        .where(Message.message_type == PENDING_REPLY_TYPE, Message.created_at < cutoff)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(Message)
+        .where(Message.id.in_(lost_ids), Message.message_type == PENDING_REPLY_TYPE)
+        .values(
+            content=UNANSWERED_REPLY,
+            message_type=UNANSWERED_REPLY_TYPE,
+            confidence=0.0,
+            token_count=estimate_tokens(UNANSWERED_REPLY)
+        )
+        .returning(Message.conversation_id, Message.seq)
+        .execution_options(synchronize_session=False)
+    )
+    lost = result.all()
+    await db.commit()
+    for conversation_id, seq in lost:
+        logger.error(f"Reply {seq} for conversation {conversation_id} was never stored; marked unanswered")
+        history_cache.invalidate(conversation_id)
+    if lost:
+        metrics.counter("chat_replies_unanswered_total").inc(len(lost))
+    return len(lost)
+
+
+async def _reconcile_job() -> None:
+    session_local = get_async_session_local()
+    async with session_local() as session:
+        await reconcile_lost_replies(
+            session,
+            timedelta(seconds=settings.chat_reply_reconcile_after_seconds),
+            settings.chat_reply_reconcile_batch_size
+        )
+
+
+reply_reconcile_task = register_periodic_task(
+    PeriodicTask("chat-reply-reconcile", _reconcile_job, settings.chat_reply_reconcile_interval_seconds, initial_delay=60)
+)
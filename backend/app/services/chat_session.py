@@ -0,0 +1,129 @@
+"""
+Per-connection chat session state for the WebSocket channel
+
+An HTTP chat turn authenticates, resolves the active conversation and reads
+recent history on every request. A WebSocket connection does all three once
+and then keeps its own buffer of recent turns and the rolling summary, so a
+turn costs one short transaction (reserve sequence numbers and insert the
+user message) on top of the model call.
+
+The buffer is trusted while the conversation's sequence numbers stay
+contiguous with what the connection has seen. If another tab or device
+wrote in between, the reserved seq shows the gap and turns and summary are
+re-read (through the shared history cache) before the prompt is built.
+"""
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.tokens import estimate_tokens
+from app.db.models.chat import Conversation, Message
+from app.db.session import get_async_session_local
+from app.services.chat_history import HistoryTurn, allocate_seq, get_recent_turns
+from app.services.conversation_memory import build_context
+
+settings = get_settings()
+
+
+class ChatSession:
+    """Conversation id, rolling summary and recent turns of one connection"""
+
+    def __init__(
+        self,
+        user_id: uuid.UUID,
+        conversation_id: uuid.UUID,
+        summary: Optional[str],
+        summary_through_seq: int,
+        last_seq: int,
+        turns: List[HistoryTurn]
+    ):
+        self.user_id = user_id
+        self.conversation_id = conversation_id
+        self.summary = summary
+        self.summary_through_seq = summary_through_seq
+        self.last_seq = last_seq
+        self.turns: Deque[HistoryTurn] = deque(turns, maxlen=max(settings.chat_history_messages, 1))
+
+    @classmethod
+    async def open(cls, db: AsyncSession, conversation: Conversation) -> "ChatSession":
+        """Session for ``conversation``, with its recent turns loaded"""
+        turns = await get_recent_turns(db, conversation.id, conversation.last_seq)
+        return cls(
+            user_id=conversation.user_id,
+            conversation_id=conversation.id,
+            summary=conversation.summary,
+            summary_through_seq=conversation.summary_through_seq or 0,
+            last_seq=conversation.last_seq,
+            turns=turns
+        )
+
+    async def begin_turn(self, db: AsyncSession, text: str) -> Message:
+        """
+        Reserve this turn's user message and reply positions and add the user
+        message to ``db`` (flushed, not committed).
+        """
+        user_seq = await allocate_seq(db, self.conversation_id, 2)
+        if user_seq != self.last_seq + 1:
+            # Someone else wrote to this conversation since our last turn
+            metrics.counter("chat_ws_session_reloads_total").inc()
+            await self._reload(db, user_seq - 1)
+        user_msg = Message(
+            conversation_id=self.conversation_id,
+            seq=user_seq,
+            role="user",
+            content=text,
+            message_type="normal"
+        )
+        db.add(user_msg)
+        await db.flush()
+        return user_msg
+
+    def context(self, user_msg: Message) -> List[Dict[str, str]]:
+        """Summary, budgeted recent turns and the new user message, formatted for the LLM"""
+        return build_context(
+            self.summary,
+            self.summary_through_seq,
+            list(self.turns),
+            {"role": "user", "content": user_msg.content}
+        )
+
+    def record(self, seq: int, role: str, content: str) -> None:
+        """Append a turn this connection has written"""
+        self.turns.append(HistoryTurn(seq=seq, role=role, content=content, token_count=estimate_tokens(content)))
+        self.last_seq = max(self.last_seq, seq)
+
+    def skip(self, seq: int) -> None:
+        """Account for a reserved position that ended up without a message"""
+        self.last_seq = max(self.last_seq, seq)
+
+    def forget(self, seq: int) -> None:
+        """Drop a recorded user message whose turn could not be answered"""
+        if self.turns and self.turns[-1].seq == seq:
+            self.turns.pop()
+        self.skip(seq + 1)
+
+    async def refresh_summary(self) -> None:
+        """Pick up a summary written after this session was opened"""
+        session_local = get_async_session_local()
+        async with session_local() as db:
+            await self._load_summary(db)
+
+    async def _load_summary(self, db: AsyncSession) -> None:
+        result = await db.execute(
+            select(Conversation.summary, Conversation.summary_through_seq)
+            .where(Conversation.id == self.conversation_id)
+        )
+        row = result.first()
+        if row is not None:
+            self.summary = row.summary
+            self.summary_through_seq = row.summary_through_seq or 0
+
+    async def _reload(self, db: AsyncSession, through_seq: int) -> None:
+        await self._load_summary(db)
+        self.turns = deque(await get_recent_turns(db, self.conversation_id, through_seq), maxlen=self.turns.maxlen)
+        self.last_seq = through_seq
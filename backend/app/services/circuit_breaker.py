@@ -0,0 +1,168 @@
+"""
+Circuit breaker for the Gemini upstream
+
+Quota (429 / RESOURCE_EXHAUSTED) and timeout failures are tracked over a
+sliding window. Once they make up ``failure_rate`` of at least ``min_calls``
+recent calls, the breaker opens and callers use the local responder instead
+of waiting on an upstream that is known to be failing. After a cool-down a
+background probe runs in the half-open state: success closes the breaker,
+failure reopens it with a doubled cool-down. Interactive traffic never acts
+as the probe.
+
+The breaker also holds the retry budget: each success earns ``retry_ratio``
+of a retry token (up to ``max_retry_tokens``) and each retry spends one, so
+retries stay a bounded fraction of traffic and stop entirely while open.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """'quota' or 'timeout' for failures that count against the breaker, else None"""
+    if isinstance(error, asyncio.TimeoutError) or "timeout" in type(error).__name__.lower():
+        return "timeout"
+    message = str(error)
+    if "429" in message or "RESOURCE_EXHAUSTED" in message:
+        return "quota"
+    if "DEADLINE_EXCEEDED" in message or "504" in message:
+        return "timeout"
+    return None
+
+
+class CircuitBreaker:
+    """Failure-rate breaker with background half-open probes"""
+
+    def __init__(
+        self,
+        name: str,
+        probe: Optional[Callable[[], Awaitable[None]]] = None,
+        window_seconds: float = 60.0,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        cooldown_seconds: float = 30.0,
+        max_cooldown_seconds: float = 300.0,
+        retry_ratio: float = 0.2,
+        max_retry_tokens: float = 10.0
+    ):
+        self.name = name
+        self.probe = probe
+        self.window_seconds = window_seconds
+        self.min_calls = max(min_calls, 1)
+        self.failure_rate = failure_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.retry_ratio = retry_ratio
+        self.max_retry_tokens = max_retry_tokens
+        self._retry_tokens = max_retry_tokens
+        self.state = CLOSED
+        self._cooldown = cooldown_seconds
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._probe_task: Optional[asyncio.Task] = None
+        self._set_state(CLOSED)
+
+    def allow(self) -> bool:
+        """True if a call may go upstream"""
+        return self.state == CLOSED
+
+    def acquire_retry(self) -> bool:
+        """Spend a retry token; False if the budget is exhausted or the breaker is not closed"""
+        if self.state != CLOSED or self._retry_tokens < 1:
+            metrics.counter("llm_retries_denied_total", model=self.name).inc()
+            return False
+        self._retry_tokens -= 1
+        return True
+
+    def record_success(self) -> None:
+        self._retry_tokens = min(self.max_retry_tokens, self._retry_tokens + self.retry_ratio)
+        self._record(False)
+
+    def record_failure(self, error: BaseException) -> None:
+        """Count ``error`` if it is a quota/timeout failure; may open the breaker"""
+        kind = classify_error(error)
+        if kind is None:
+            self._record(False)
+            return
+        metrics.counter("llm_upstream_failures_total", model=self.name, kind=kind).inc()
+        self._record(True)
+        if self.state == CLOSED and self._should_trip():
+            self._open()
+
+    def _record(self, failed: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, failed))
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def _should_trip(self) -> bool:
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return False
+        failures = sum(1 for _, failed in self._outcomes if failed)
+        return failures / calls >= self.failure_rate
+
+    def _open(self) -> None:
+        logger.warning(f"Circuit for {self.name} opened; using the local responder for {self._cooldown:.0f}s")
+        self._set_state(OPEN)
+        self._outcomes.clear()
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop(), name=f"circuit-probe-{self.name}")
+
+    async def _probe_loop(self) -> None:
+        while self.state != CLOSED:
+            await asyncio.sleep(self._cooldown)
+            self._set_state(HALF_OPEN)
+            try:
+                if self.probe is not None:
+                    await self.probe()
+            except Exception as e:
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown_seconds)
+                logger.warning(f"Circuit probe for {self.name} failed: {str(e)}; retrying in {self._cooldown:.0f}s")
+                self._set_state(OPEN)
+                continue
+            logger.info(f"Circuit for {self.name} closed")
+            self._cooldown = self.cooldown_seconds
+            self._set_state(CLOSED)
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            metrics.counter("llm_circuit_transitions_total", model=self.name, state=state).inc()
+        self.state = state
+        metrics.gauge("llm_circuit_state", model=self.name).set(_STATE_VALUES[state])
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(model: str, probe: Optional[Callable[[], Awaitable[None]]] = None) -> CircuitBreaker:
+    """The breaker for ``model``, created on first use"""
+    breaker = _breakers.get(model)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            model,
+            probe=probe,
+            window_seconds=settings.llm_breaker_window_seconds,
+            min_calls=settings.llm_breaker_min_calls,
+            failure_rate=settings.llm_breaker_failure_rate,
+            cooldown_seconds=settings.llm_breaker_cooldown_seconds,
+            max_cooldown_seconds=settings.llm_breaker_max_cooldown_seconds,
+            retry_ratio=settings.llm_retry_budget_ratio,
+            max_retry_tokens=settings.llm_retry_budget_max_tokens
+        )
+        _breakers[model] = breaker
+    return breaker
@@ -0,0 +1,126 @@
+"""
+Conversation memory: rolling summaries for long conversations
+
+Only the latest ``chat_history_messages`` messages are sent verbatim. Older
+messages are folded into ``Conversation.summary`` by a background job that
+runs after the reply has been sent, so every LLM call carries at most
+summary + recent window regardless of conversation length.
+
+Within that window the prompt is also bounded by ``chat_context_token_budget``:
+turns are added newest to oldest using the token count stored on each message
+until the budget is spent.
+"""
+import logging
+import uuid
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.tokens import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+from app.db.models.chat import Conversation, Message
+from app.db.session import get_async_session_local
+from app.services.chat_history import HistoryTurn
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Conversations with a summarization already running in this worker
+_in_progress: Set[uuid.UUID] = set()
+
+
+def summary_message(summary: Optional[str]) -> List[Dict[str, str]]:
+    """The stored summary as a system message (empty if there is none)"""
+    if not summary:
+        return []
+    return [{"role": "system", "content": f"Summary of the earlier conversation with this user: {summary}"}]
+
+
+def build_context(
+    summary: Optional[str],
+    summary_through_seq: int,
+    turns: List[HistoryTurn],
+    user_message: Dict[str, str],
+    token_budget: Optional[int] = None
+) -> List[Dict[str, str]]:
+    """
+    Summary, as many recent turns as fit in ``token_budget`` and the new user message.
+    The user message and summary are always sent; older turns are dropped first.
+    """
+    if token_budget is None:
+        token_budget = settings.chat_context_token_budget
+    head = summary_message(summary)
+    remaining = token_budget - estimate_tokens(user_message["content"]) - MESSAGE_OVERHEAD_TOKENS
+    for message in head:
+        remaining -= estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+    selected: List[Dict[str, str]] = []
+    for turn in reversed(turns):
+        if turn.seq <= summary_through_seq:
+            break
+        cost = (turn.token_count or estimate_tokens(turn.content)) + MESSAGE_OVERHEAD_TOKENS
+        if cost > remaining:
+            break
+        remaining -= cost
+        selected.append(turn.as_message())
+    selected.reverse()
+    return head + selected + [user_message]
+
+
+def needs_summary(summary_through_seq: int, last_seq: int) -> bool:
+    """True once enough messages have aged out of the verbatim window"""
+    unsummarized_old = last_seq - settings.chat_history_messages - summary_through_seq
+    return unsummarized_old >= settings.chat_summary_batch_messages
+
+
+async def summarize_conversation(db: AsyncSession, conversation_id: uuid.UUID, ai_client) -> bool:
+    """Fold aged-out messages into the conversation summary. Returns True if updated."""
+    conversation = await db.get(Conversation, conversation_id)
+    if conversation is None or not needs_summary(conversation.summary_through_seq, conversation.last_seq):
+        return False
+
+    start = conversation.summary_through_seq
+    through = conversation.last_seq - settings.chat_history_messages
+    result = await db.execute(
+        select(Message.role, Message.content)
+        .where(
+            Message.conversation_id == conversation_id,
+            Message.seq > start,
+            Message.seq <= through,
+            Message.message_type.is_distinct_from("crisis"),
+            Message.stored_clause()
+        )
+        .order_by(Message.seq)
+    )
+    messages = [{"role": row.role, "content": row.content} for row in result]
+    summary = await ai_client.summarize(conversation.summary, messages, max_chars=settings.chat_summary_max_chars)
+
+    # Compare-and-set so a concurrent summarizer in another worker cannot regress it
+    updated = await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id, Conversation.summary_through_seq == start)
+        .values(summary=summary, summary_through_seq=through)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if updated.rowcount:
+        metrics.counter("chat_summaries_total").inc()
+        return True
+    return False
+
+
+async def maybe_summarize(conversation_id: uuid.UUID, ai_client) -> None:
+    """Background entry point; at most one run per conversation per worker"""
+    if conversation_id in _in_progress:
+        return
+    _in_progress.add(conversation_id)
+    try:
+        session_local = get_async_session_local()
+        async with session_local() as session:
+            await summarize_conversation(session, conversation_id, ai_client)
+    except Exception as e:
+        logger.error(f"Summarizing conversation {conversation_id} failed: {str(e)}")
+    finally:
+        _in_progress.discard(conversation_id)
@@ -1,34 +1,156 @@
 """
-Email Service for sending OTPs via Brevo HTTP API
+Email Service: transactional outbox with asynchronous delivery via Brevo HTTP API
+
+Request handlers queue messages with EmailService and return immediately.
+The outbox worker claims due rows, delivers them concurrently through a pooled
+async HTTP client and reschedules failures with exponential backoff.
 """
-import json
-import urllib.request
-import urllib.error
+import asyncio
 import logging
+import random
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.core.config import get_settings
+from app.core.tasks import PeriodicTask, register_periodic_task
+from app.db.models.email_outbox import EmailOutbox
+from app.db.session import get_async_session_local
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# Global to track the last error for the /api/status check
-last_email_error = None
+BREVO_URL = "https://api.brevo.com/v3/smtp/email"
+# How long a claimed row stays invisible to other workers before it is retried
+SEND_LEASE_SECONDS = 120
 
-class EmailService:
-    @staticmethod
-    def send_otp_email(to_email: str, otp: str) -> bool:
-        """
-        Send professional HTML OTP email using Brevo HTTP API.
-        Returns True if successful, False otherwise.
-        """
-        global last_email_error
-        
-        if not settings.brevo_api_key or settings.brevo_api_key == "your-brevo-api-key":
-            last_email_error = "Brevo API Key missing or default in configuration"
-            logger.warning(last_email_error)
-            return False
-
-        # Create HTML content
-        html_content = f"""
+
+@dataclass
+class EmailMessage:
+    to_email: str
+    subject: str
+    html_content: str
+    text_content: Optional[str] = None
+
+
+class EmailDeliveryError(Exception):
+    """Raised by transports; ``retryable`` is False for permanent rejections"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+# ------------------------------------------------------------------------------
+# Transports
+# ------------------------------------------------------------------------------
+class EmailTransport(ABC):
+    """Delivery backend used by the outbox worker"""
+
+    @abstractmethod
+    async def send(self, message: EmailMessage) -> None:
+        """Deliver one message; raise on failure so the row is retried"""
+
+    async def close(self) -> None:
+        pass
+
+
+class BrevoTransport(EmailTransport):
+    """Brevo API v3 over a shared, connection-pooled httpx client"""
+
+    def __init__(self, api_key: Optional[str], timeout: float = 20.0, max_connections: int = 10):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections)
+            )
+        return self._client
+
+    async def send(self, message: EmailMessage) -> None:
+        if not self.api_key or self.api_key == "your-brevo-api-key":
+            raise EmailDeliveryError("Brevo API Key missing or default in configuration", retryable=False)
+
+        # Prepare payload according to Brevo API v3 spec
+        payload = {
+            "sender": {
+                "name": settings.mail_from_name,
+                "email": settings.mail_from_address
+            },
+            "to": [{"email": message.to_email}],
+            "subject": message.subject,
+            "htmlContent": message.html_content,
+            "textContent": message.text_content or ""
+        }
+        headers = {"api-key": self.api_key, "Content-Type": "application/json"}
+
+        import httpx
+        try:
+            response = await self._get_client().post(BREVO_URL, json=payload, headers=headers)
+        except httpx.HTTPError as e:
+            raise EmailDeliveryError(f"Brevo API error: {str(e)}")
+
+        if response.status_code in (200, 201, 202):
+            return
+        error_msg = f"Brevo API HTTPError {response.status_code}: {response.text}"
+        # 4xx other than throttling will not succeed on retry
+        retryable = response.status_code == 429 or response.status_code >= 500
+        raise EmailDeliveryError(error_msg, retryable=retryable)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class StubTransport(EmailTransport):
+    """Local transport that records messages instead of sending them (development/tests)"""
+
+    def __init__(self):
+        self.sent: List[EmailMessage] = []
+
+    async def send(self, message: EmailMessage) -> None:
+        logger.info(f"[stub email] to={message.to_email} subject={message.subject!r}")
+        self.sent.append(message)
+
+
+_transport: Optional[EmailTransport] = None
+
+def get_email_transport() -> EmailTransport:
+    """Get the configured transport (EMAIL_TRANSPORT=brevo|stub)"""
+    global _transport
+    if _transport is None:
+        if settings.email_transport == "stub":
+            _transport = StubTransport()
+        else:
+            _transport = BrevoTransport(settings.brevo_api_key, max_connections=settings.email_max_concurrency)
+    return _transport
+
+def set_email_transport(transport: EmailTransport) -> None:
+    """Swap the transport (e.g. a StubTransport in tests)"""
+    global _transport
+    _transport = transport
+
+async def close_email_transport() -> None:
+    if _transport is not None:
+        await _transport.close()
+
+
+# ------------------------------------------------------------------------------
+# Outbox
+# ------------------------------------------------------------------------------
+def render_otp_email(to_email: str, otp: str) -> EmailMessage:
+    html_content = f"""
         <html>
             <body style="font-family: 'Inter', sans-serif; background-color: #f8fafc; padding: 40px; color: #1e293b;">
                 <div style="max-width: 500px; margin: 0 auto; background: #ffffff; border-radius: 12px; padding: 32px; box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);">
@@ -46,51 +168,138 @@ class EmailService:
             </body>
         </html>
         """
+    return EmailMessage(
+        to_email=to_email,
+        subject=f"{otp} is your YuVA verification code",
+        html_content=html_content,
+        text_content=f"Your OTP code is: {otp}"
+    )
 
-        url = "https://api.brevo.com/v3/smtp/email"
-        headers = {
-            "api-key": settings.brevo_api_key,
-            "Content-Type": "application/json"
-        }
-        
-        # Prepare payload according to Brevo API v3 spec
-        payload = {
-            "sender": {
-                "name": settings.mail_from_name,
-                "email": settings.mail_from_address
-            },
-            "to": [{"email": to_email}],
-            "subject": f"{otp} is your YuVA verification code",
-            "htmlContent": html_content,
-            "textContent": f"Your OTP code is: {otp}"
-        }
 
-        try:
-            logger.info(f"Sending OTP email via Brevo API to {to_email}")
-
-            data = json.dumps(payload).encode("utf-8")
-            req = urllib.request.Request(url, data=data, headers=headers, method="POST")
-
-            with urllib.request.urlopen(req, timeout=20) as response:
-                if response.status in [200, 201, 202]:
-                    last_email_error = None
-                    logger.info("OTP email sent successfully")
-                    return True
-                else:
-                    error_msg = f"Brevo API error: Status {response.status}"
-                    logger.error(error_msg)
-                    last_email_error = error_msg
-                    return False
-
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode()
-            error_msg = f"Brevo API HTTPError {e.code}: {error_body}"
-            logger.error(error_msg)
-            last_email_error = error_msg
-            return False
-
-        except Exception as e:
-            error_msg = f"Brevo API error: {str(e)}"
-            logger.error(error_msg)
-            last_email_error = error_msg
-            return False
+def retry_delay(attempts: int) -> float:
+    """Capped exponential backoff with jitter"""
+    delay = min(settings.email_retry_max_seconds, settings.email_retry_base_seconds * (2 ** (attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class EmailService:
+    @staticmethod
+    async def queue_email(db: AsyncSession, message: EmailMessage) -> EmailOutbox:
+        """Persist an email in the outbox and nudge the worker. Never blocks on the provider."""
+        row = EmailOutbox(
+            to_email=message.to_email,
+            subject=message.subject,
+            html_content=message.html_content,
+            text_content=message.text_content,
+            status="pending",
+            attempts=0
+        )
+        db.add(row)
+        await db.commit()
+        email_outbox_task.trigger()
+        return row
+
+    @staticmethod
+    async def queue_otp_email(db: AsyncSession, to_email: str, otp: str) -> EmailOutbox:
+        """Queue the professional HTML OTP email"""
+        message = render_otp_email(to_email, otp)
+        logger.info(f"Queued OTP email to {to_email}")
+        return await EmailService.queue_email(db, message)
+
+    @staticmethod
+    async def claim_due(db: AsyncSession, batch_size: int) -> List[EmailOutbox]:
+        """Lease a batch of due rows (pending, or sending with an expired lease)"""
+        now = datetime.now(timezone.utc)
+        result = await db.execute(
+            select(EmailOutbox)
+            .where(
+                EmailOutbox.status.in_(("pending", "sending")),
+                EmailOutbox.next_attempt_at <= now
+            )
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = list(result.scalars().all())
+        for row in rows:
+            row.status = "sending"
+            row.next_attempt_at = now + timedelta(seconds=SEND_LEASE_SECONDS)
+        await db.commit()
+        return rows
+
+    @staticmethod
+    async def deliver_pending(
+        db: AsyncSession,
+        transport: Optional[EmailTransport] = None,
+        batch_size: Optional[int] = None
+    ) -> int:
+        """Deliver one batch of due emails concurrently. Returns the number sent."""
+        transport = transport or get_email_transport()
+        rows = await EmailService.claim_due(db, batch_size or settings.email_outbox_batch_size)
+        if not rows:
+            return 0
+
+        semaphore = asyncio.Semaphore(settings.email_max_concurrency)
+
+        async def send_one(row: EmailOutbox) -> Optional[EmailDeliveryError]:
+            message = EmailMessage(row.to_email, row.subject, row.html_content, row.text_content)
+            async with semaphore:
+                try:
+                    await transport.send(message)
+                    return None
+                except EmailDeliveryError as e:
+                    return e
+                except Exception as e:
+                    return EmailDeliveryError(f"Email transport error: {str(e)}")
+
+        results = await asyncio.gather(*(send_one(row) for row in rows))
+
+        sent = 0
+        now = datetime.now(timezone.utc)
+        for row, error in zip(rows, results):
+            row.attempts += 1
+            if error is None:
+                row.status = "sent"
+                row.sent_at = now
+                row.last_error = None
+                sent += 1
+            elif not error.retryable or row.attempts >= settings.email_max_attempts:
+                row.status = "failed"
+                row.last_error = str(error)
+                logger.error(f"Email {row.id} to {row.to_email} failed permanently: {error}")
+            else:
+                row.status = "pending"
+                row.next_attempt_at = now + timedelta(seconds=retry_delay(row.attempts))
+                row.last_error = str(error)
+                logger.warning(f"Email {row.id} attempt {row.attempts} failed, will retry: {error}")
+        await db.commit()
+        return sent
+
+    @staticmethod
+    async def purge_delivered(db: AsyncSession, older_than: timedelta = timedelta(days=1), batch_size: int = 500) -> int:
+        """Remove delivered rows (they contain OTP codes) once they are no longer useful"""
+        cutoff = datetime.now(timezone.utc) - older_than
+        old_ids = (
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status == "sent", EmailOutbox.sent_at < cutoff)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            delete(EmailOutbox).where(EmailOutbox.id.in_(old_ids)).execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount or 0
+
+
+async def _outbox_job() -> None:
+    session_local = get_async_session_local()
+    async with session_local() as session:
+        while await EmailService.deliver_pending(session) >= settings.email_outbox_batch_size:
+            pass
+        await EmailService.purge_delivered(session)
+
+
+email_outbox_task = register_periodic_task(
+    PeriodicTask("email-outbox", _outbox_job, settings.email_outbox_poll_seconds)
+)
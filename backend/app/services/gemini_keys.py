@@ -0,0 +1,109 @@
+"""
+Gemini API key pool
+
+Each configured key (or project) has its own quota, so chat throughput grows
+with the number of keys. The pool tracks a one-minute request window per key,
+leases the least-loaded key that is under ``requests_per_minute``, and
+sidelines a key that returns 429 until the server's retry hint (or the rate
+window) has passed. Keys are never logged; metrics label them key0, key1, ...
+"""
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, List, Optional
+
+from app.core.config import Settings
+from app.core.metrics import metrics
+from app.services.circuit_breaker import classify_error
+from app.services.llm_dispatch import LLMOverloaded
+from app.services.llm_retry import retry_after_hint
+
+WINDOW_SECONDS = 60.0
+
+
+def configured_keys(settings: Settings) -> List[str]:
+    """GEMINI_API_KEY followed by GEMINI_API_KEYS (comma-separated), without duplicates"""
+    keys = [settings.gemini_api_key or ""] + (settings.gemini_api_keys or "").split(",")
+    return list(dict.fromkeys(k.strip() for k in keys if k and k.strip()))
+
+
+class GeminiKey:
+    __slots__ = ("label", "client", "window", "in_flight", "sidelined_until")
+
+    def __init__(self, label: str, client: Any):
+        self.label = label
+        self.client = client
+        self.window: Deque[float] = deque()
+        self.in_flight = 0
+        self.sidelined_until = 0.0
+
+    def load(self, now: float) -> int:
+        cutoff = now - WINDOW_SECONDS
+        while self.window and self.window[0] <= cutoff:
+            self.window.popleft()
+        return len(self.window) + self.in_flight
+
+
+class GeminiKeyPool:
+    """Least-loaded leasing over per-key rate windows"""
+
+    def __init__(self, api_keys: List[str], client_factory: Callable[[str], Any], requests_per_minute: int = 0):
+        self.requests_per_minute = requests_per_minute
+        self.keys = [GeminiKey(f"key{i}", client_factory(key)) for i, key in enumerate(api_keys)]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _usable(self, key: GeminiKey, now: float) -> bool:
+        if key.sidelined_until > now:
+            return False
+        return not self.requests_per_minute or len(key.window) < self.requests_per_minute
+
+    def pick(self) -> Optional[GeminiKey]:
+        """The least-loaded usable key, or None if every key is sidelined or at its limit"""
+        now = time.monotonic()
+        best, best_load = None, None
+        for key in self.keys:
+            load = key.load(now)
+            if self._usable(key, now) and (best_load is None or load < best_load):
+                best, best_load = key, load
+        return best
+
+    def has_capacity(self) -> bool:
+        return self.pick() is not None
+
+    def retry_after(self) -> float:
+        """Seconds until some key becomes usable again"""
+        now = time.monotonic()
+        waits = []
+        for key in self.keys:
+            key.load(now)
+            wait = max(key.sidelined_until - now, 0.0)
+            if self.requests_per_minute and len(key.window) >= self.requests_per_minute:
+                wait = max(wait, key.window[0] + WINDOW_SECONDS - now)
+            waits.append(wait)
+        return min(waits) if waits else WINDOW_SECONDS
+
+    def sideline(self, key: GeminiKey, seconds: float) -> None:
+        key.sidelined_until = max(key.sidelined_until, time.monotonic() + seconds)
+        metrics.counter("gemini_key_sidelined_total", key=key.label).inc()
+
+    @asynccontextmanager
+    async def lease(self, model: str) -> AsyncIterator[Any]:
+        """Yield a client for the least-loaded key; raises LLMOverloaded if none is usable"""
+        key = self.pick()
+        if key is None:
+            metrics.counter("llm_rejected_total", model=model, reason="keys_exhausted").inc()
+            raise LLMOverloaded(model, "keys_exhausted", retry_after=max(1, math.ceil(self.retry_after())))
+        key.window.append(time.monotonic())
+        key.in_flight += 1
+        metrics.counter("gemini_key_requests_total", key=key.label).inc()
+        try:
+            yield key.client
+        except Exception as e:
+            if classify_error(e) == "quota":
+                self.sideline(key, retry_after_hint(e) or WINDOW_SECONDS)
+            raise
+        finally:
+            key.in_flight -= 1
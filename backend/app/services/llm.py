@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any, AsyncGenerator
+from typing import List, Dict, Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Tuple
+import hashlib
+import inspect
+import logging
 import os
 import random
 import asyncio
@@ -8,6 +11,21 @@ import json
 from datetime import datetime
 
 from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.phrase_matcher import PhraseMatcher
+from app.core.singleflight import SingleFlight
+from app.services.circuit_breaker import CircuitBreaker, get_breaker
+from app.services.gemini_keys import GeminiKeyPool, configured_keys
+from app.services.llm_dispatch import LLMOverloaded, Priority, get_bulkhead
+from app.services.llm_retry import next_delay
+from app.services.response_cache import response_cache
+from app.services.safety import CRISIS_SPELLINGS, add_crisis_phrases, crisis_category_of
+
+logger = logging.getLogger(__name__)
+
+
+class LLMStreamError(Exception):
+    """A streamed reply could not be produced or broke off part-way"""
 
 
 EMPATHETIC_SYSTEM_PROMPT = (
@@ -19,6 +37,13 @@ EMPATHETIC_SYSTEM_PROMPT = (
     "academic pressure, family dynamics, and crisis intervention. Provide empathetic, evidence-based support."
 )
 
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a young person and YUVA, a wellness companion. "
+    "Merge the existing summary with the new turns into at most 150 words, written in the third person. "
+    "Keep the user's main concerns, feelings, important life context, coping strategies already suggested "
+    "and anything they asked YUVA to remember. Omit greetings and small talk. Do not add advice."
+)
+
 # Comprehensive mental health knowledge base
 MENTAL_HEALTH_KNOWLEDGE = {
     "anxiety": {
@@ -106,7 +131,6 @@ MENTAL_HEALTH_KNOWLEDGE = {
         ]
     },
     "crisis": {
-        "indicators": ["self-harm", "suicide", "hopeless", "worthless", "ending it all", "no point", "better off dead"],
         "responses": [
             "I'm very concerned about you right now. Your life has value and meaning, even when it doesn't feel that way.",
             "Thank you for trusting me with these difficult feelings. Please know that you're not alone and help is available.",
@@ -122,25 +146,47 @@ MENTAL_HEALTH_KNOWLEDGE = {
 }
 
 
+_GREETINGS = ["hello", "hi", "hey", "namaste", "good morning", "good afternoon", "good evening"]
+# Checked in this order when no knowledge-base topic matches
+_EMOTION_WORDS = {
+    "sad": ["sad", "depressed", "down", "blue", "unhappy", "udas"],
+    "anxious": ["anxious", "worried", "nervous", "panic", "stress", "stressed", "stressful", "tension", "ghabrahat", "pareshan"],
+    "happy": ["happy", "good", "great", "excited", "joy", "khushi", "achha"],
+}
+_MOCK_TOPICS = [topic for topic in MENTAL_HEALTH_KNOWLEDGE if topic != "crisis"]
+
+
+def _build_mock_matcher() -> PhraseMatcher:
+    matcher = add_crisis_phrases(PhraseMatcher(aliases=CRISIS_SPELLINGS))
+    matcher.add("greeting", _GREETINGS)
+    for topic in _MOCK_TOPICS:
+        matcher.add(f"topic:{topic}", MENTAL_HEALTH_KNOWLEDGE[topic]["symptoms"], inflect=True)
+    for emotion, emotion_words in _EMOTION_WORDS.items():
+        matcher.add(f"emotion:{emotion}", emotion_words, inflect=True)
+    return matcher
+
+
+# Every crisis/greeting/topic/emotion phrase, matched in one pass per message
+_MOCK_MATCHER = _build_mock_matcher()
+
+
 def _mock_model(messages: List[Dict[str, str]], model_name: str = "mock-model") -> str:
     user_msgs = [m.get("content", "") for m in messages if m.get("role") == "user"]
     system_msgs = [m.get("content", "") for m in messages if m.get("role") == "system"]
     last_user = (user_msgs[-1] if user_msgs else "").strip()
-    last_user_l = last_user.lower()
 
     # Check if Hinglish mode is requested - look for specific Hinglish instruction
     is_hinglish = any("hinglish" in msg.lower() for msg in system_msgs)
 
-    crisis_indicators = MENTAL_HEALTH_KNOWLEDGE["crisis"]["indicators"]
-    if any(indicator in last_user_l for indicator in crisis_indicators):
+    hits = _MOCK_MATCHER.scan(last_user)
+    if crisis_category_of(hits):
         crisis_response = random.choice(MENTAL_HEALTH_KNOWLEDGE["crisis"]["responses"])
         resources = "\n\n".join(MENTAL_HEALTH_KNOWLEDGE["crisis"]["resources"])
         if is_hinglish:
             return f"{crisis_response}\n\nTurant madad available hai:\n{resources}\n\nPlease kisi bhi resource se contact karo. Aap important ho, aur log aapki help karna chahte hain."
         return f"{crisis_response}\n\nImmediate Help Available:\n{resources}\n\nPlease reach out to one of these resources right away. You matter, and there are people who want to help."
 
-    greetings = ["hello", "hi", "hey", "namaste", "good morning", "good afternoon", "good evening"]
-    if any(last_user_l.startswith(g) or g in last_user_l for g in greetings):
+    if "greeting" in hits:
         if is_hinglish:
             return random.choice([
                 "Namaste! Main YuVA hun, aapka wellness companion. Main yahan hun bina kisi judgment ke sunne ke liye aur aapko support karne ke liye jo bhi aap experience kar rahe ho. Aaj aap kaisa feel kar rahe hain?",
@@ -167,20 +213,10 @@ def _mock_model(messages: List[Dict[str, str]], model_name: str = "mock-model")
             "relationships, and academic pressure. What would be most helpful for you right now?"
         )
 
-    # Check for Hindi/Hinglish words in user message
-    hindi_words = ["stress", "tension", "pareshani", "problem", "dikkat", "mushkil", "anxiety", "ghabrahat", "dar", "khushi", "sad", "udas", "pareshan", "mujhe", "main", "hai", "ho", "kar", "ke", "liye"]
-    contains_hindi = any(word in last_user_l for word in hindi_words)
-    
     # Use Hinglish only if explicitly requested via system message, not just based on Hindi words
     use_hinglish = is_hinglish
 
-    detected_topic = None
-    for topic, data in MENTAL_HEALTH_KNOWLEDGE.items():
-        if topic == "crisis":
-            continue
-        if any(symptom in last_user_l for symptom in data["symptoms"]):
-            detected_topic = topic
-            break
+    detected_topic = next((topic for topic in _MOCK_TOPICS if f"topic:{topic}" in hits), None)
 
     if detected_topic:
         topic_data = MENTAL_HEALTH_KNOWLEDGE[detected_topic]
@@ -234,7 +270,7 @@ def _mock_model(messages: List[Dict[str, str]], model_name: str = "mock-model")
         return " ".join(response_parts)
 
     # Emotion-based responses for general emotional states
-    if any(word in last_user_l for word in ["sad", "depressed", "down", "blue", "unhappy", "udas"]):
+    if "emotion:sad" in hits:
         if use_hinglish:
             responses = [
                 "Main aapke words mein sadness sun sakti hun, aur main chahti hun ki aap jaanein ki aisa feel karna completely valid hai. Sadness ek natural human emotion hai, even though yeh painful hai. Aapke heart pe kya baat bhari hai lately?",
@@ -247,7 +283,7 @@ def _mock_model(messages: List[Dict[str, str]], model_name: str = "mock-model")
                 "Thank you for trusting me with these difficult feelings. When we're sad, it can feel like the world has lost its color. You're not alone in this - I'm here with you. What would feel most supportive right now?",
                 "I'm sensing a lot of pain in what you've shared. Sadness can feel overwhelming, but it's also a sign of your capacity to care deeply. What's one small thing that has brought you comfort in the past?"
             ]
-    elif any(word in last_user_l for word in ["anxious", "worried", "nervous", "panic", "stress", "stressed", "tension", "ghabrahat", "pareshan"]):
+    elif "emotion:anxious" in hits:
         if use_hinglish:
             responses = [
                 "Main aapke message mein anxiety feel kar sakti hun, aur main chahti hun ki aap jaanein ki jo aap experience kar rahe hain wo real aur valid hai. Anxiety hamara mind race kara deti hai. Chaliye aapko is moment mein ground karte hain - kya aap 3 cheezein bata sakte hain jo aap abhi apne around dekh sakte hain?",
@@ -260,7 +296,7 @@ def _mock_model(messages: List[Dict[str, str]], model_name: str = "mock-model")
                 "Anxiety can be really overwhelming and exhausting. You're showing strength by reaching out. Sometimes our anxiety is trying to protect us, but it can feel too intense. What does your anxiety feel like in your body right now?",
                 "I hear how worried you're feeling. Anxiety often comes with a lot of 'what if' thoughts. Remember, you've gotten through anxious moments before, even when they felt impossible. What's one thing that has helped you feel calmer in the past?"
             ]
-    elif any(word in last_user_l for word in ["happy", "good", "great", "excited", "joy", "khushi", "achha"]):
+    elif "emotion:happy" in hits:
         if use_hinglish:
             responses = [
                 "Mujhe aapke positive feelings ke baare mein sunna bahut achha lag raha hai! Jab hum life ke good moments ko notice aur savor kar sakte hain toh yeh wonderful hota hai. Kya aapko yeh joy de raha hai? Main aapke saath celebrate karna chahti hun.",
@@ -291,17 +327,27 @@ def _mock_model(messages: List[Dict[str, str]], model_name: str = "mock-model")
     return random.choice(responses)
 
 
-async def _mock_model_stream(messages: List[Dict[str, str]], model_name: str = "mock-model") -> AsyncGenerator[str, None]:
+async def _mock_model_stream(
+    messages: List[Dict[str, str]],
+    model_name: str = "mock-model",
+    pacing: float = 0.0
+) -> AsyncGenerator[str, None]:
+    """
+    Stream the mock reply word by word.
+    ``pacing`` is an optional per-word delay in seconds for a "typing" effect
+    (longer after punctuation); by default words are emitted immediately.
+    """
     full_response = _mock_model(messages, model_name=model_name)
     words = full_response.split()
     
     for i, word in enumerate(words):
-        if word.endswith(('.', '!', '?')):
-            await asyncio.sleep(0.3)
-        elif word.endswith((',', ';', ':')):
-            await asyncio.sleep(0.2)
-        else:
-            await asyncio.sleep(0.1)
+        if pacing:
+            if word.endswith(('.', '!', '?')):
+                await asyncio.sleep(pacing * 3)
+            elif word.endswith((',', ';', ':')):
+                await asyncio.sleep(pacing * 2)
+            else:
+                await asyncio.sleep(pacing)
         
         if i < len(words) - 1:
             yield f"{word} "
@@ -309,128 +355,536 @@ async def _mock_model_stream(messages: List[Dict[str, str]], model_name: str = "
             yield word
 
 
+async def coalesce_stream(
+    stream: AsyncIterator[str],
+    max_chars: int = 48,
+    max_delay: float = 0.05
+) -> AsyncGenerator[str, None]:
+    """
+    Merge small chunks into fewer writes.
+    Buffered text is flushed once it reaches ``max_chars`` or once ``max_delay``
+    seconds have passed since the first buffered chunk, whichever comes first.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = stream.__aiter__()
+    buffer: List[str] = []
+    size = 0
+    deadline: float | None = None
+    pending: asyncio.Future | None = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # Time threshold hit while the next chunk is still on its way
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+                continue
+
+            finished, pending = pending, None
+            try:
+                chunk = finished.result()
+            except StopAsyncIteration:
+                break
+            if not chunk:
+                continue
+            buffer.append(chunk)
+            size += len(chunk)
+            if deadline is None:
+                deadline = loop.time() + max_delay
+            if size >= max_chars:
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            # Let the cancelled step finish; aclose() fails on a running generator
+            await asyncio.gather(pending, return_exceptions=True)
+        # Release the upstream now (bulkhead slot, key lease) rather than at GC
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def _to_genai_request(messages: List[Dict[str, str]]) -> Tuple[List[Dict[str, Any]], Any]:
+    """Format chat messages for google-genai: (contents, config with system instruction)"""
+    contents = []
+    system_instruction = ""
+    for m in messages:
+        role = m.get("role", "user")
+        if role == "system":
+            system_instruction += m.get("content", "") + "\n"
+        elif role == "assistant":
+            contents.append({"role": "model", "parts": [{"text": m.get("content", "")}]})
+        else:
+            contents.append({"role": "user", "parts": [{"text": m.get("content", "")}]})
+
+    from google.genai import types
+    config = types.GenerateContentConfig(
+        system_instruction=system_instruction.strip()
+    ) if system_instruction else None
+    return contents, config
+
+
+def _mock_summary(previous_summary: str | None, messages: List[Dict[str, str]], max_chars: int) -> str:
+    """Extractive fallback summary: what the user talked about, most recent last"""
+    points = [m.get("content", "").strip().replace("\n", " ") for m in messages if m.get("role") == "user"]
+    points = [p if len(p) <= 160 else p[:157] + "..." for p in points if p]
+    summary = " ".join(filter(None, [previous_summary, "User shared: " + " | ".join(points) if points else ""]))
+    # Keep the newest material when trimming
+    return summary if len(summary) <= max_chars else "..." + summary[-(max_chars - 3):]
+
+
+class ModelRouter:
+    """
+    Chooses the ordered model chain for a turn.
+    Short messages early in a conversation prefer the fast tier, longer or deeper
+    turns the standard tier. A tier whose recent success rate has dropped below
+    one half, or whose latency is above ``slow_seconds``, is swapped behind the
+    other when that one is doing better, and drifts back towards healthy while
+    bypassed so it gets retried. Outcomes are fed back via ``record``.
+    """
+
+    def __init__(
+        self,
+        standard_model: str,
+        fast_model: str | None = None,
+        short_chars: int = 200,
+        shallow_messages: int = 6,
+        slow_seconds: float = 6.0,
+        smoothing: float = 0.2
+    ):
+        self.standard_model = standard_model
+        self.fast_model = fast_model if fast_model and fast_model != standard_model else None
+        self.short_chars = short_chars
+        self.shallow_messages = shallow_messages
+        self.slow_seconds = slow_seconds
+        self.smoothing = smoothing
+        # model -> [latency EWMA seconds, success EWMA]
+        self._stats: Dict[str, List[float]] = {}
+
+    def chain(self, user_messages: List[Dict[str, str]], model_override: str | None = None) -> List[str]:
+        """Models to try in order; the local responder is the implicit last step"""
+        tiers = [m for m in (self.standard_model, self.fast_model) if m]
+        if model_override:
+            return [model_override] + [m for m in tiers if m != model_override]
+        if self.fast_model is None:
+            return tiers
+
+        turns = [m for m in user_messages if m.get("role") != "system"]
+        last = turns[-1].get("content", "") if turns else ""
+        if len(last) <= self.short_chars and len(turns) <= self.shallow_messages:
+            preferred, other = self.fast_model, self.standard_model
+        else:
+            preferred, other = self.standard_model, self.fast_model
+        if self._doing_worse(preferred, other):
+            self._forgive(preferred)
+            preferred, other = other, preferred
+        metrics.counter("llm_route_total", model=preferred).inc()
+        return [preferred, other]
+
+    def record(self, model: str, latency: float, ok: bool) -> None:
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats[model] = [latency, 1.0 if ok else 0.0]
+        else:
+            a = self.smoothing
+            stats[0] += a * (latency - stats[0])
+            stats[1] += a * ((1.0 if ok else 0.0) - stats[1])
+        metrics.gauge("llm_route_latency_seconds", model=model).set(stats[0])
+        metrics.gauge("llm_route_success_ratio", model=model).set(stats[1])
+
+    def _forgive(self, model: str) -> None:
+        """Drift a bypassed tier's stats back towards healthy so it is tried again"""
+        stats = self._stats[model]
+        a = self.smoothing / 4
+        stats[0] -= a * stats[0]
+        stats[1] += a * (1.0 - stats[1])
+
+    def _doing_worse(self, model: str, other: str) -> bool:
+        mine, theirs = self._stats.get(model), self._stats.get(other)
+        if mine is None:
+            return False
+        other_latency, other_success = theirs if theirs is not None else (0.0, 1.0)
+        if mine[1] < 0.5 and other_success > mine[1]:
+            return True
+        return mine[0] > self.slow_seconds and other_latency < mine[0]
+
+
+_settings = get_settings()
+model_router = ModelRouter(
+    standard_model=_settings.vertex_model or "gemini-2.0-flash",
+    fast_model=_settings.llm_fast_model,
+    short_chars=_settings.llm_route_short_chars,
+    shallow_messages=_settings.llm_route_shallow_messages,
+    slow_seconds=_settings.llm_route_slow_seconds
+)
+
+
 class EnhancedGenerativeAIClient:
     def __init__(self) -> None:
         self.settings = get_settings()
-        self.use_mock = not bool(self.settings.gemini_api_key)
-        self._client = None
+        self.use_mock = not configured_keys(self.settings)
+        self._pool: GeminiKeyPool | None = None
         self._model_name = self.settings.vertex_model or "gemini-2.0-flash"
+        self._chat_flights = SingleFlight("llm-chat")
+
+    @property
+    def model_name(self) -> str:
+        """Default model when a request does not name one"""
+        return self._model_name
 
     def _ensure_client(self) -> None:
-        if self._client is not None:
+        if self._pool is not None:
             return
         try:
             from google import genai
-            if self.settings.gemini_api_key:
-                self._client = genai.Client(api_key=self.settings.gemini_api_key)
+            api_keys = configured_keys(self.settings)
+            if api_keys:
+                base_url = self.settings.gemini_base_url
+                http_options = {"base_url": base_url} if base_url else None
+                self._pool = GeminiKeyPool(
+                    api_keys,
+                    client_factory=lambda key: genai.Client(api_key=key, http_options=http_options),
+                    requests_per_minute=self.settings.gemini_key_requests_per_minute
+                )
             else:
                 self.use_mock = True
         except ImportError:
             self.use_mock = True
-            self._client = None
+            self._pool = None
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        return get_breaker(model, probe=lambda: self._probe(model))
 
-    async def chat(self, user_messages: List[Dict[str, str]], model_override: str | None = None) -> str:
+    async def _probe(self, model: str) -> None:
+        """Minimal upstream call used by the circuit breaker in half-open state"""
+        async with get_bulkhead(model).slot(Priority.BACKGROUND), self._pool.lease(model) as client:
+            await client.aio.models.generate_content(
+                model=model,
+                contents=[{"role": "user", "parts": [{"text": "ping"}]}]
+            )
+
+    async def chat(
+        self,
+        user_messages: List[Dict[str, str]],
+        model_override: str | None = None,
+        priority: Priority = Priority.USER,
+        timeout: float | None = None,
+        opening: bool = False
+    ) -> str:
+        """
+        Generate a reply; identical concurrent requests share one upstream call.
+        ``opening`` marks the first turn of a new conversation, whose reply may be cached.
+        Models are tried along ``model_router``'s chain and the local responder
+        answers if none succeeds. Raises LLMOverloaded when every model's bulkhead
+        rejects the call and asyncio.TimeoutError when no reply arrives within
+        ``timeout`` seconds (queueing included); the upstream call is cancelled then.
+        """
+        model = model_override or self._model_name
+        key = hashlib.sha256(json.dumps([model, user_messages], sort_keys=True).encode()).hexdigest()
+        return await self._chat_flights.do(key, lambda: self._chat(user_messages, model_override, priority, timeout, opening))
+
+    def fallback_reply(self, user_messages: List[Dict[str, str]], model_override: str | None = None) -> str:
+        """Immediate reply from the local responder"""
+        messages = [{"role": "system", "content": EMPATHETIC_SYSTEM_PROMPT}] + user_messages
+        return _mock_model(messages, model_name=model_override or self._model_name)
+
+    def fallback_stream(
+        self,
+        user_messages: List[Dict[str, str]],
+        model_override: str | None = None,
+        pacing: float = 0.0
+    ) -> AsyncGenerator[str, None]:
+        """Streamed reply from the local responder"""
+        messages = [{"role": "system", "content": EMPATHETIC_SYSTEM_PROMPT}] + user_messages
+        return _mock_model_stream(messages, model_name=model_override or self._model_name, pacing=pacing)
+
+    async def _generate(self, model: str, contents: Any, config: Any, priority: Priority) -> Any:
+        async with get_bulkhead(model).slot(priority), self._pool.lease(model) as client:
+            return await client.aio.models.generate_content(
+                model=model,
+                contents=contents,
+                config=config
+            )
+
+    async def _with_retries(
+        self,
+        model: str,
+        breaker: CircuitBreaker,
+        timeout: float | None,
+        attempt_call: Callable[[float | None], Awaitable[Any]]
+    ) -> Any:
+        """
+        Run ``attempt_call(remaining_seconds)`` and retry transient failures while
+        the deadline and the breaker's retry budget allow (see services.llm_retry).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = None if deadline is None else deadline - loop.time()
+            try:
+                return await attempt_call(remaining)
+            except (LLMOverloaded, asyncio.TimeoutError):
+                raise
+            except Exception as e:
+                remaining = None if deadline is None else deadline - loop.time()
+                delay = next_delay(e, attempt, remaining, alternate_key=len(self._pool) > 1 and self._pool.has_capacity())
+                if delay is None or not breaker.acquire_retry():
+                    raise
+                breaker.record_failure(e)
+                metrics.counter("llm_retries_total", model=model).inc()
+                await asyncio.sleep(delay)
+
+    async def _first_available(
+        self,
+        chain: List[str],
+        timeout: float | None,
+        attempt_call: Callable[[str, float | None], Awaitable[Any]]
+    ) -> Tuple[Any, str, CircuitBreaker] | None:
+        """
+        Walk the routing chain: ``attempt_call(model, remaining_seconds)`` with retries
+        for each model whose circuit is closed, until one succeeds. Returns
+        (result, model, breaker), or None when the chain is exhausted and the caller
+        should use the local responder. The deadline is shared by the whole chain, so
+        asyncio.TimeoutError ends it; LLMOverloaded is raised only if every model tried
+        rejected the call for lack of capacity.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        overloaded: LLMOverloaded | None = None
+        other_failure = False
+        for model in chain:
+            breaker = self._breaker(model)
+            if not breaker.allow():
+                metrics.counter("llm_route_skipped_total", model=model, reason="circuit_open").inc()
+                other_failure = True
+                continue
+            started = loop.time()
+            remaining = None if deadline is None else deadline - started
+            try:
+                result = await self._with_retries(
+                    model, breaker, remaining, lambda r, m=model: attempt_call(m, r)
+                )
+            except LLMOverloaded as e:
+                metrics.counter("llm_route_skipped_total", model=model, reason=e.reason).inc()
+                if e.reason == "keys_exhausted":
+                    other_failure = True
+                else:
+                    overloaded = e
+                continue
+            except asyncio.TimeoutError as e:
+                breaker.record_failure(e)
+                model_router.record(model, loop.time() - started, ok=False)
+                raise
+            except Exception as e:
+                breaker.record_failure(e)
+                model_router.record(model, loop.time() - started, ok=False)
+                logger.error(f"Gemini call to {model} failed: {str(e)}")
+                other_failure = True
+                continue
+            model_router.record(model, loop.time() - started, ok=True)
+            return result, model, breaker
+        if overloaded is not None and not other_failure:
+            raise overloaded
+        return None
+
+    async def _chat(
+        self,
+        user_messages: List[Dict[str, str]],
+        model_override: str | None,
+        priority: Priority,
+        timeout: float | None,
+        opening: bool
+    ) -> str:
         model = model_override or self._model_name
         messages = [{"role": "system", "content": EMPATHETIC_SYSTEM_PROMPT}] + user_messages
         if self.use_mock:
             return _mock_model(messages, model_name=model)
 
         self._ensure_client()
-        if self._client is None:
+        if self._pool is None:
             return _mock_model(messages)
 
-        try:
-            # Format messages for google-genai
-            contents = []
-            system_instruction = ""
-            for m in messages:
-                role = m.get("role", "user")
-                if role == "system":
-                    system_instruction += m.get("content", "") + "\n"
-                elif role == "assistant":
-                    contents.append({"role": "model", "parts": [{"text": m.get("content", "")}]})
-                else:
-                    contents.append({"role": "user", "parts": [{"text": m.get("content", "")}]})
-            
-            # Using new generate_content API with system instructions
-            from google.genai import types
-            config = types.GenerateContentConfig(
-                system_instruction=system_instruction.strip()
-            ) if system_instruction else None
+        cache_key = response_cache.key_for(user_messages, model, opening)
+        if cache_key is not None:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-            response = await self._client.aio.models.generate_content(
-                model=model,
-                contents=contents,
-                config=config
-            )
-            return getattr(response, "text", "I'm here for you.")
+        # Using new generate_content API with system instructions
+        contents, config = _to_genai_request(messages)
+        outcome = await self._first_available(
+            model_router.chain(user_messages, model_override),
+            timeout,
+            lambda m, remaining: asyncio.wait_for(self._generate(m, contents, config, priority), remaining)
+        )
+        if outcome is None:
+            # primary -> secondary -> local responder
+            metrics.counter("llm_fallback_total", model=model, reason="chain_exhausted").inc()
+            return _mock_model(messages, model_name=model)
+
+        response, _, breaker = outcome
+        breaker.record_success()
+        text = getattr(response, "text", "I'm here for you.")
+        if cache_key is not None:
+            response_cache.put(cache_key, text)
+        return text
+
+    async def summarize(
+        self,
+        previous_summary: str | None,
+        messages: List[Dict[str, str]],
+        max_chars: int = 1500
+    ) -> str:
+        """
+        Fold ``messages`` into the running conversation summary.
+        Raises on upstream errors; callers run this in the background.
+        """
+        if self.use_mock:
+            return _mock_summary(previous_summary, messages, max_chars)
+
+        self._ensure_client()
+        if self._pool is None or not self._breaker(self._model_name).allow():
+            return _mock_summary(previous_summary, messages, max_chars)
+
+        transcript = "\n".join(f"{m.get('role', 'user')}: {m.get('content', '')}" for m in messages)
+        prompt = (
+            f"Existing summary:\n{previous_summary or '(none)'}\n\n"
+            f"New conversation turns:\n{transcript}\n\n"
+            "Write the updated summary."
+        )
+        contents, config = _to_genai_request([
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ])
+        breaker = self._breaker(self._model_name)
+        try:
+            response = await self._generate(self._model_name, contents, config, Priority.BACKGROUND)
+        except LLMOverloaded as e:
+            if e.reason == "keys_exhausted":
+                return _mock_summary(previous_summary, messages, max_chars)
+            raise
         except Exception as e:
-            import traceback; traceback.print_exc()
-            error_msg = str(e)
-            print(f"DEBUG: Gemini API Error with Model {self._model_name}: {error_msg}")
-            
-            # Diagnostic: check if key looks valid
-            key = self.settings.gemini_api_key or ""
-            if not key:
-                return "Error: GEMINI_API_KEY is missing in the environment."
-            if len(key) < 30:
-                return f"Error: API Key found but seems too short ({len(key)} chars). Please verify it."
-                
-            if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                return (
-                    "YuVA is currently resting (Limit reached). 🧘‍♂️ "
-                    "This usually happens when the free-tier API quota is hit. "
-                    "Please wait a minute or two and try again. Don't worry, I'll be back soon!"
-                )
-                
-            return f"An error occurred connecting to the AI: {error_msg}. Please check if your API key is restricted or if the Generative Language API is enabled in your Google Cloud Console."
+            breaker.record_failure(e)
+            raise
+        breaker.record_success()
+        summary = (getattr(response, "text", "") or "").strip()
+        return summary[:max_chars] if summary else _mock_summary(previous_summary, messages, max_chars)
 
-    async def chat_stream(self, user_messages: List[Dict[str, str]], model_override: str | None = None) -> AsyncGenerator[str, None]:
+    async def chat_stream(
+        self,
+        user_messages: List[Dict[str, str]],
+        model_override: str | None = None,
+        pacing: float = 0.0,
+        priority: Priority = Priority.USER,
+        first_token_timeout: float | None = None,
+        opening: bool = False
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream the reply as it is generated.
+        ``opening`` marks the first turn of a new conversation, whose reply may be cached.
+        ``pacing`` adds a presentation delay (seconds) after each chunk; none by default.
+        Models are tried along ``model_router``'s chain until one produces a first chunk.
+        The bulkhead slot is held for the whole stream; raises LLMOverloaded if no model
+        admits the call, asyncio.TimeoutError (before anything is yielded) if the first
+        chunk does not arrive within ``first_token_timeout`` seconds, and LLMStreamError
+        if the upstream stream fails once started.
+        """
         model = model_override or self._model_name
         messages = [{"role": "system", "content": EMPATHETIC_SYSTEM_PROMPT}] + user_messages
         
         if self.use_mock:
-            async for chunk in _mock_model_stream(messages, model_name=model):
+            async for chunk in _mock_model_stream(messages, model_name=model, pacing=pacing):
                 yield chunk
             return
 
         self._ensure_client()
-        if self._client is None:
-            yield "AI Error: Client could not be initialized. Please check your GEMINI_API_KEY."
-            return
+        if self._pool is None:
+            raise LLMStreamError("Gemini client could not be initialized; check GEMINI_API_KEY")
 
-        contents = []
-        system_instruction = ""
-        for m in messages:
-            role = m.get("role", "user")
-            if role == "system":
-                system_instruction += m.get("content", "") + "\n"
-            elif role == "assistant":
-                contents.append({"role": "model", "parts": [{"text": m.get("content", "")}]})
-            else:
-                contents.append({"role": "user", "parts": [{"text": m.get("content", "")}]})
+        cache_key = response_cache.key_for(user_messages, model, opening)
+        if cache_key is not None:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        contents, config = _to_genai_request(messages)
 
-        from google.genai import types
-        config = types.GenerateContentConfig(
-            system_instruction=system_instruction.strip()
-        ) if system_instruction else None
+        async def open_stream(m: str, remaining: float | None) -> Tuple[AsyncGenerator[str, None], str | None]:
+            stream = self._upstream_stream(m, contents, config, priority)
+            try:
+                try:
+                    return stream, await asyncio.wait_for(stream.__anext__(), remaining)
+                except StopAsyncIteration:
+                    return stream, None
+            except BaseException:
+                await stream.aclose()
+                raise
 
+        # Retries and fallbacks are only possible before anything has been yielded
+        outcome = await self._first_available(
+            model_router.chain(user_messages, model_override), first_token_timeout, open_stream
+        )
+        if outcome is None:
+            metrics.counter("llm_fallback_total", model=model, reason="chain_exhausted").inc()
+            async for chunk in _mock_model_stream(messages, model_name=model, pacing=pacing):
+                yield chunk
+            return
+
+        (upstream, first), _, breaker = outcome
         try:
-            response_stream = await self._client.aio.models.generate_content_stream(
+            parts: List[str] = []
+            if first is not None:
+                parts.append(first)
+                yield first
+                if pacing:
+                    await asyncio.sleep(pacing)
+                async for text in upstream:
+                    parts.append(text)
+                    yield text
+                    if pacing:
+                        await asyncio.sleep(pacing)
+
+            breaker.record_success()
+            if cache_key is not None:
+                response_cache.put(cache_key, "".join(parts))
+                    
+        except Exception as e:
+            breaker.record_failure(e)
+            logger.exception(f"Chat stream from {model} broke off")
+            raise LLMStreamError(str(e)) from e
+        finally:
+            await upstream.aclose()
+
+    async def _upstream_stream(
+        self,
+        model: str,
+        contents: Any,
+        config: Any,
+        priority: Priority
+    ) -> AsyncGenerator[str, None]:
+        """Text chunks from Gemini, holding a bulkhead slot and a key lease until the stream ends"""
+        async with get_bulkhead(model).slot(priority), self._pool.lease(model) as client:
+            response_stream = client.aio.models.generate_content_stream(
                 model=model,
                 contents=contents,
                 config=config
             )
-            
+            # google-genai 0.5 returns an async generator; later releases a coroutine
+            if inspect.isawaitable(response_stream):
+                response_stream = await response_stream
             async for chunk in response_stream:
                 if hasattr(chunk, 'text') and chunk.text:
                     yield chunk.text
-                    await asyncio.sleep(0.05)
-                    
-        except Exception as e:
-            import traceback; traceback.print_exc()
-            error_msg = str(e)
-            yield f"Chat Stream Error: {error_msg}. (Verify your GEMINI_API_KEY in Render/Local .env)"
 
 
 class GenerativeAIClient(EnhancedGenerativeAIClient):
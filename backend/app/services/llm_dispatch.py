@@ -0,0 +1,141 @@
+"""
+Admission control for outbound LLM calls
+
+Each model gets a bulkhead: at most ``llm_max_concurrency`` upstream calls run
+at once, further callers wait in a bounded priority queue, and callers are
+rejected immediately when the queue is full or once their wait deadline
+passes. Registered users are served before guests, and background jobs
+(summaries) only get a slot when no interactive caller is waiting.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+settings = get_settings()
+
+
+class Priority(IntEnum):
+    """Lower value is served first"""
+    USER = 0
+    GUEST = 1
+    BACKGROUND = 2
+
+
+class LLMOverloaded(Exception):
+    """The call was not admitted: queue full or wait deadline passed"""
+
+    def __init__(self, model: str, reason: str, retry_after: int = 1):
+        super().__init__(f"LLM capacity exhausted for {model} ({reason})")
+        self.model = model
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """Bounded concurrency with a bounded, prioritised wait queue"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, f in self._waiters if not f.done())
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.USER, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        await self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: Priority = Priority.USER, timeout: Optional[float] = None) -> None:
+        started = time.perf_counter()
+        if self.active < self.max_concurrency and not self.queued:
+            self.active += 1
+            self._observe(priority, started)
+            return
+
+        if self.queued >= self.max_queue:
+            self._reject("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._counter), future))
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(future, timeout if timeout is not None else self.max_wait)
+        except asyncio.TimeoutError:
+            self._prune()
+            self._reject("timeout")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled
+                self.release()
+            self._prune()
+            raise
+        self._observe(priority, started)
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # Hand the slot straight to the next waiter; ``active`` is unchanged
+                future.set_result(None)
+                self._update_gauges()
+                return
+        self.active -= 1
+        self._update_gauges()
+
+    def _prune(self) -> None:
+        self._waiters = [w for w in self._waiters if not w[2].done()]
+        heapq.heapify(self._waiters)
+        self._update_gauges()
+
+    def _reject(self, reason: str) -> None:
+        metrics.counter("llm_rejected_total", model=self.name, reason=reason).inc()
+        raise LLMOverloaded(self.name, reason)
+
+    def _observe(self, priority: Priority, started: float) -> None:
+        metrics.summary("llm_queue_wait_seconds", model=self.name, priority=priority.name.lower()).observe(
+            time.perf_counter() - started
+        )
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        metrics.gauge("llm_queue_depth", model=self.name).set(self.queued)
+        metrics.gauge("llm_in_flight", model=self.name).set(self.active)
+
+
+_bulkheads: Dict[str, Bulkhead] = {}
+
+
+def get_bulkhead(model: str) -> Bulkhead:
+    """The bulkhead for ``model``, created on first use"""
+    bulkhead = _bulkheads.get(model)
+    if bulkhead is None:
+        bulkhead = Bulkhead(
+            model,
+            max_concurrency=settings.llm_max_concurrency,
+            max_queue=settings.llm_max_queue,
+            max_wait=settings.llm_queue_timeout_seconds
+        )
+        _bulkheads[model] = bulkhead
+    return bulkhead
+
+
+def priority_for(user) -> Priority:
+    """Interactive priority class for a user"""
+    return Priority.GUEST if getattr(user, "is_guest", False) else Priority.USER
@@ -0,0 +1,93 @@
+"""
+Retry policy for upstream LLM calls
+
+Only transient failures are retried: 5xx responses, connection errors, and
+429s whose server retry hint fits in the remaining deadline. Waits use capped
+exponential backoff with full jitter, or the server's hint when it gives one.
+A retry is attempted only while the request deadline allows it and the
+model's circuit breaker grants a token from its retry budget, so retries
+cannot amplify an outage. A generate_content call has no side effects, so
+repeating it is safe.
+"""
+import asyncio
+import random
+import re
+from typing import Optional
+
+from app.core.config import get_settings
+from app.services.circuit_breaker import classify_error
+
+settings = get_settings()
+
+_TRANSIENT_STATUSES = {"UNAVAILABLE", "INTERNAL", "DEADLINE_EXCEEDED"}
+_RETRY_DELAY_RE = re.compile(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for failures that are likely to succeed on a later attempt"""
+    if isinstance(error, asyncio.TimeoutError):
+        # The request deadline is spent
+        return False
+    if isinstance(error, (ConnectionError, OSError)):
+        return True
+    name = type(error).__name__
+    if "Connect" in name or "RemoteProtocol" in name or "ReadError" in name:
+        return True
+    code = _status_code(error)
+    if code is not None:
+        return code == 429 or code >= 500
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message or any(s in message for s in _TRANSIENT_STATUSES)
+
+
+def retry_after_hint(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After header or RetryInfo), if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            pass
+    match = _RETRY_DELAY_RE.search(str(getattr(error, "details", "") or error))
+    return float(match.group(1)) if match else None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter delay before retry number ``attempt`` (1-based)"""
+    cap = min(settings.llm_retry_max_delay_seconds, settings.llm_retry_base_delay_seconds * (2 ** (attempt - 1)))
+    return random.uniform(0, cap)
+
+
+def next_delay(
+    error: BaseException,
+    attempt: int,
+    remaining: Optional[float],
+    alternate_key: bool = False
+) -> Optional[float]:
+    """
+    How long to wait before retrying after ``error``, or None to give up.
+    ``attempt`` is the number of attempts made so far; ``remaining`` is the time
+    left until the request deadline (None for no deadline). ``alternate_key``
+    means another API key with spare quota is available, so a quota error can
+    be retried on it straight away.
+    """
+    if attempt >= settings.llm_retry_max_attempts or not is_retryable(error):
+        return None
+    if alternate_key and classify_error(error) == "quota":
+        return 0.0
+    hint = retry_after_hint(error)
+    if hint is None and classify_error(error) == "quota":
+        # Quota without a hint: waiting a few hundred ms will not help
+        return None
+    delay = hint if hint is not None else backoff_delay(attempt)
+    if remaining is not None and delay >= remaining:
+        return None
+    return delay
+
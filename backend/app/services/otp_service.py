@@ -0,0 +1,70 @@
+"""
+OTP lookup and lifecycle maintenance
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.tasks import PeriodicTask, register_periodic_task
+from app.db.models.otp import OTP
+from app.db.session import get_async_session_local
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class OTPService:
+    """OTP queries and cleanup"""
+
+    @staticmethod
+    async def get_valid_otp(db: AsyncSession, email: str) -> Optional[OTP]:
+        """Latest still-valid OTP for an email; expired/used rows never leave the database"""
+        result = await db.execute(
+            select(OTP)
+            .where(OTP.email == email, OTP.valid_clause())
+            .order_by(OTP.expires_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def purge_stale_otps(db: AsyncSession, batch_size: int, max_batches: int = 20) -> int:
+        """
+        Delete expired, used or exhausted OTPs in bounded batches.
+        Each batch is its own short transaction; rows locked by another worker are skipped.
+        """
+        total = 0
+        for _ in range(max_batches):
+            stale_ids = (
+                select(OTP.id)
+                .where(OTP.stale_clause(datetime.now(timezone.utc)))
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                delete(OTP).where(OTP.id.in_(stale_ids)).execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            deleted = result.rowcount or 0
+            total += deleted
+            if deleted < batch_size:
+                break
+        return total
+
+
+async def _purge_job() -> None:
+    session_local = get_async_session_local()
+    async with session_local() as session:
+        deleted = await OTPService.purge_stale_otps(session, settings.otp_purge_batch_size)
+    if deleted:
+        logger.info(f"Purged {deleted} stale OTP codes")
+
+
+otp_purge_task = register_periodic_task(
+    PeriodicTask("otp-purge", _purge_job, settings.otp_purge_interval_seconds, initial_delay=30)
+)
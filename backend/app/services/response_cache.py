@@ -0,0 +1,127 @@
+"""
+Chat response cache for context-free opening turns
+
+Openers such as "hi", "hello!!" or "how are you?" that start a new
+conversation are sent with no history, so the reply depends only on the text
+and the model. Those replies are cached per worker under the normalized text,
+with TTL and LRU eviction. Each entry is filled by ``variants`` model calls
+before it starts serving hits, and hits pick one of them at random so repeat
+visitors do not always get the same greeting. Crisis-flagged text is never
+cached.
+"""
+import random
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.services.safety import detect_crisis
+
+settings = get_settings()
+
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+# "hiiii" / "heyyy" -> "hi" / "hey"
+_REPEAT_RE = re.compile(r"(\w)\1{2,}")
+
+
+def normalize_prompt(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a short prompt"""
+    text = _NON_WORD_RE.sub(" ", text.lower())
+    text = _REPEAT_RE.sub(r"\1", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class _CacheEntry:
+    __slots__ = ("replies", "fills", "expires_at")
+
+    def __init__(self, expires_at: float):
+        self.replies: List[str] = []
+        self.fills = 0
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Per-worker TTL + LRU cache of replies keyed by (model, normalized prompt)"""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600.0,
+        variants: int = 1,
+        max_prompt_chars: int = 48
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.variants = max(variants, 1)
+        self.max_prompt_chars = max_prompt_chars
+        self._entries: "OrderedDict[Tuple[str, str], _CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, messages: List[Dict[str, str]], model: str, opening: bool) -> Optional[Tuple[str, str]]:
+        """
+        Cache key, or None when the request is not a cacheable opener.
+        ``opening`` must say whether this is the conversation's first turn: a
+        later turn can also reach the model as a single message once the token
+        budget has dropped its history, and must not get a generic greeting.
+        """
+        if not opening or self.max_entries <= 0 or len(messages) != 1 or messages[0].get("role") != "user":
+            return None
+        text = messages[0].get("content", "")
+        if len(text) > self.max_prompt_chars * 2 or detect_crisis(text):
+            return None
+        normalized = normalize_prompt(text)
+        if not normalized or len(normalized) > self.max_prompt_chars:
+            return None
+        return model, normalized
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            entry = None
+        if entry is None or entry.fills < self.variants:
+            self._record(hit=False)
+            return None
+        self._entries.move_to_end(key)
+        self._record(hit=True)
+        return random.choice(entry.replies)
+
+    def put(self, key: Tuple[str, str], reply: str) -> None:
+        if not reply:
+            return
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _CacheEntry(time.monotonic() + self.ttl_seconds)
+            self._entries[key] = entry
+        entry.fills += 1
+        if reply not in entry.replies and len(entry.replies) < self.variants:
+            entry.replies.append(reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        metrics.counter("chat_response_cache_total", result="hit" if hit else "miss").inc()
+        metrics.gauge("chat_response_cache_hit_ratio").set(self.hits / (self.hits + self.misses))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache(
+    max_entries=settings.response_cache_size,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+    variants=settings.response_cache_variants,
+    max_prompt_chars=settings.response_cache_max_prompt_chars
+)
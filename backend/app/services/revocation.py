@@ -0,0 +1,149 @@
+"""
+Access token revocation
+
+Two mechanisms:
+- Per-token: logout stores the token's ``jti`` in ``revoked_tokens``.
+- Per-user: password changes bump ``User.token_epoch``; tokens carry the epoch
+  they were issued under. The user row is already loaded for every
+  authenticated request, so this check costs nothing extra.
+
+Every worker keeps a Bloom filter of revoked jtis rebuilt from the database
+periodically. A token absent from the filter is definitely not revoked
+(by this worker's last sync), so the table is only queried on filter hits.
+Revocations made by other workers become visible after the next sync; this
+worker's own are carried into each rebuilt filter until a sync has read them
+back, so a logout racing a sync is never dropped.
+"""
+import hashlib
+import logging
+import math
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.tasks import PeriodicTask, register_periodic_task
+from app.db.models.revoked_token import RevokedToken
+from app.db.session import get_async_session_local
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one blake2b digest"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationList:
+    """Bloom-filter fronted view of ``revoked_tokens``"""
+
+    def __init__(self, capacity: int = 10000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        # jti -> expiry of local revocations not yet seen by a sync's read
+        self._unsynced: Dict[str, datetime] = {}
+        self.synced_at: Optional[datetime] = None
+
+    def might_be_revoked(self, jti: str) -> bool:
+        return jti in self._filter
+
+    async def is_revoked(self, db: AsyncSession, jti: str) -> bool:
+        if not self.might_be_revoked(jti):
+            return False
+        result = await db.execute(select(RevokedToken.id).where(RevokedToken.jti == jti).limit(1))
+        return result.first() is not None
+
+    async def revoke(
+        self,
+        db: AsyncSession,
+        jti: str,
+        expires_at: datetime,
+        user_id: Optional[uuid.UUID] = None
+    ) -> None:
+        self._filter.add(jti)
+        self._unsynced[jti] = expires_at
+        db.add(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Already revoked (e.g. logout clicked twice)
+            await db.rollback()
+
+    async def revoke_payload(self, db: AsyncSession, payload: Dict[str, Any]) -> bool:
+        """Revoke a decoded access token. Returns False for tokens without a jti."""
+        jti = payload.get("jti")
+        if not jti:
+            return False
+        expires_at = datetime.fromtimestamp(payload.get("exp", 0), tz=timezone.utc)
+        user_id = None
+        try:
+            user_id = uuid.UUID(payload.get("sub", ""))
+        except (ValueError, TypeError):
+            pass
+        await self.revoke(db, jti, expires_at, user_id)
+        return True
+
+    async def sync(self, db: AsyncSession) -> int:
+        """Rebuild the filter from unexpired rows and drop expired ones"""
+        now = datetime.now(timezone.utc)
+        await db.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= now).execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        result = await db.execute(select(RevokedToken.jti).where(RevokedToken.expires_at > now))
+        jtis = result.scalars().all()
+
+        # Revocations from this worker whose commit the read above may have
+        # missed (in flight, or landing while it ran) go into the new filter too
+        stored = set(jtis)
+        for jti, expires_at in list(self._unsynced.items()):
+            if jti in stored or expires_at <= now:
+                del self._unsynced[jti]
+        fresh = BloomFilter(max(self.capacity, (len(jtis) + len(self._unsynced)) * 2), self.error_rate)
+        for jti in jtis:
+            fresh.add(jti)
+        for jti in self._unsynced:
+            fresh.add(jti)
+        self._filter = fresh
+        self.synced_at = now
+        return len(jtis)
+
+
+revocation_list = RevocationList(capacity=settings.revocation_filter_capacity)
+
+
+async def _sync_job() -> None:
+    session_local = get_async_session_local()
+    async with session_local() as session:
+        await revocation_list.sync(session)
+
+
+revocation_sync_task = register_periodic_task(
+    PeriodicTask("token-revocation-sync", _sync_job, settings.revocation_sync_seconds)
+)
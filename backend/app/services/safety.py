@@ -1,33 +1,79 @@
 from __future__ import annotations
 
-import re
 import warnings
-from typing import Optional, Dict, List, Tuple
+from typing import FrozenSet, Optional, Dict, List, Tuple
 from datetime import datetime, timedelta
 
+from app.core.phrase_matcher import PhraseMatcher
+
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
-# Crisis patterns
-CRISIS_PATTERNS = [
-    re.compile(r"\b(suicide|kill myself|end my life|self harm)\b", re.I),
-    re.compile(r"\b(hopeless|helpless|no point|give up)\b", re.I),
-    re.compile(r"\b(want to die|wish i was dead)\b", re.I),
-    re.compile(r"\b(can't take it anymore|end it all)\b", re.I),
-]
+# Crisis phrases by category, most severe first (English, Hinglish, Hindi).
+# Matching is on whole words after normalization, see app.core.phrase_matcher.
+# Inflected and negated forms are listed explicitly: the matcher only inflects
+# a phrase's last word, which would miss "killing myself" and over-match others.
+CRISIS_PHRASES: Dict[str, List[str]] = {
+    "suicide": [
+        "suicide", "suicides", "suicidal", "kill myself", "killing myself", "killed myself",
+        "end my life", "ending my life", "take my life", "taking my life", "want to die", "wanna die",
+        "wanting to die", "wish i was dead", "wish i were dead", "better off dead", "end it all", "ending it all",
+        "don't want to live", "do not want to live", "don't wanna live", "don't want to be alive",
+        "do not want to be alive", "no reason to live",
+        "khudkushi", "aatmahatya", "mar jana chahta", "mar jana chahti", "marna chahta", "marna chahti",
+        "mar jaunga", "mar jaungi", "jeena nahi chahta", "jeena nahi chahti", "jeene ka mann nahi",
+        "jeene ka man nahi", "zindagi khatam", "khud ko khatam", "sab khatam kar",
+        "आत्महत्या", "खुदकुशी", "मरना चाहता", "मरना चाहती", "जीना नहीं चाहता", "जीना नहीं चाहती",
+    ],
+    "self_harm": [
+        "self harm", "self harming", "self harmed", "selfharm", "selfharming", "hurt myself", "hurting myself",
+        "harm myself", "harming myself", "cut myself", "cutting myself",
+        "khud ko hurt", "khud ko chot", "khud ko nuksan", "apne aap ko hurt", "apne aap ko chot",
+    ],
+    "hopelessness": [
+        "hopeless", "helpless", "worthless", "no point", "give up", "can't take it anymore", "can't go on",
+        "koi umeed nahi", "koi fayda nahi", "bardasht nahi hota", "main haar gaya", "main haar gayi",
+    ],
+}
+
+# Common misspellings and romanization variants -> the spelling used above
+CRISIS_SPELLINGS: Dict[str, str] = {
+    "sucide": "suicide", "suicde": "suicide", "suiside": "suicide", "sucidal": "suicidal",
+    "suicidel": "suicidal", "myslef": "myself", "hopless": "hopeless", "worthles": "worthless",
+    "khudkhushi": "khudkushi", "khudkusi": "khudkushi", "atmahatya": "aatmahatya", "aatmhatya": "aatmahatya",
+    "jina": "jeena", "jeenaa": "jeena", "nai": "nahi", "nahin": "nahi", "nhi": "nahi",
+    "chahata": "chahta", "chahati": "chahti", "ummeed": "umeed", "umid": "umeed", "bardaasht": "bardasht",
+}
+
+
+def add_crisis_phrases(matcher: PhraseMatcher) -> PhraseMatcher:
+    """Register every crisis phrase under a ``crisis:<category>`` label"""
+    for category, phrases in CRISIS_PHRASES.items():
+        matcher.add(f"crisis:{category}", phrases)
+    return matcher
+
+
+def crisis_category_of(hits: FrozenSet[str]) -> Optional[str]:
+    """Most severe crisis category among a matcher's labels, if any"""
+    for category in CRISIS_PHRASES:
+        if f"crisis:{category}" in hits:
+            return category
+    return None
+
+
+_CRISIS_MATCHER = add_crisis_phrases(PhraseMatcher(aliases=CRISIS_SPELLINGS))
+
+
+def crisis_category(text: str) -> Optional[str]:
+    """Crisis category detected in text ("suicide", "self_harm", "hopelessness") or None"""
+    if not text:
+        return None
+    return crisis_category_of(_CRISIS_MATCHER.scan(text))
+
 
 def detect_crisis(text: str) -> bool:
     """Detect if text contains crisis indicators"""
-    if not text:
-        return False
-    
-    text_lower = text.lower()
-    
-    for pattern in CRISIS_PATTERNS:
-        if pattern.search(text_lower):
-            return True
-    
-    return False
+    return crisis_category(text) is not None
 
 def get_crisis_message() -> str:
     """Get crisis intervention message"""
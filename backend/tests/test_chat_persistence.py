@@ -0,0 +1,111 @@
+"""
+Reply placeholders: filled in through the upserting write buffer, reconciled when lost
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.db.models  # noqa: F401  (registers every table)
+from app.core.tokens import estimate_tokens
+from app.db.base_class import Base
+from app.db.models.chat import Conversation, Message
+from app.db.write_behind import WriteBehindBuffer
+from app.services.chat_history import get_recent_turns, history_cache
+from app.services.chat_persistence import (
+    UNANSWERED_REPLY,
+    UNANSWERED_REPLY_TYPE,
+    reconcile_lost_replies,
+    reply_placeholder,
+)
+
+
+async def _database():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def _turn(session_local, conversation_id, user_seq, created_at=None):
+    """Commit a user message and its reply placeholder, as the chat endpoints do"""
+    async with session_local() as db:
+        user_msg = Message(conversation_id=conversation_id, seq=user_seq, role="user", content="hello")
+        placeholder = reply_placeholder(conversation_id, user_seq + 1)
+        if created_at is not None:
+            user_msg.created_at = placeholder.created_at = created_at
+        db.add_all([user_msg, placeholder])
+        await db.commit()
+
+
+async def _rows(session_local, conversation_id):
+    async with session_local() as db:
+        result = await db.execute(
+            select(Message.seq, Message.content, Message.message_type, Message.token_count)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.seq)
+        )
+        return [tuple(row) for row in result]
+
+
+def test_reply_fills_in_its_placeholder():
+    async def scenario():
+        engine, session_local = await _database()
+        conversation_id = uuid.uuid4()
+        await _turn(session_local, conversation_id, 1)
+
+        # The placeholder is not history yet
+        async with session_local() as db:
+            history_cache.invalidate(conversation_id)
+            assert [t.seq for t in await get_recent_turns(db, conversation_id, 2)] == [1]
+
+        buffer = WriteBehindBuffer(Message, session_factory=lambda: session_local, upsert_on=("conversation_id", "seq"))
+        reply = dict(
+            conversation_id=conversation_id, seq=2, role="assistant", content="hi there",
+            message_type="normal", confidence=0.9, token_count=estimate_tokens("hi there")
+        )
+        await buffer.insert(**reply)
+        # A retry of a write that had committed is a no-op overwrite
+        await buffer.insert(**reply)
+
+        rows = await _rows(session_local, conversation_id)
+        await engine.dispose()
+        return rows
+
+    assert asyncio.run(scenario()) == [
+        (1, "hello", None, estimate_tokens("hello")),
+        (2, "hi there", "normal", estimate_tokens("hi there")),
+    ]
+
+
+def test_stale_placeholders_are_marked_unanswered():
+    async def scenario():
+        engine, session_local = await _database()
+        conversation_id = uuid.uuid4()
+        async with session_local() as db:
+            db.add(Conversation(id=conversation_id, user_id=uuid.uuid4(), last_seq=4))
+            await db.commit()
+        long_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+        await _turn(session_local, conversation_id, 1, created_at=long_ago)
+        await _turn(session_local, conversation_id, 3)
+
+        async with session_local() as db:
+            reconciled = await reconcile_lost_replies(db, timedelta(minutes=5), batch_size=10)
+            # Nothing left to do on a second pass
+            again = await reconcile_lost_replies(db, timedelta(minutes=5), batch_size=10)
+        rows = await _rows(session_local, conversation_id)
+        await engine.dispose()
+        return reconciled, again, rows
+
+    reconciled, again, rows = asyncio.run(scenario())
+    assert (reconciled, again) == (1, 0)
+    assert rows == [
+        (1, "hello", None, estimate_tokens("hello")),
+        (2, UNANSWERED_REPLY, UNANSWERED_REPLY_TYPE, estimate_tokens(UNANSWERED_REPLY)),
+        (3, "hello", None, estimate_tokens("hello")),
+        # Still within the grace period: its reply may yet be stored
+        (4, "", "pending", 0),
+    ]
@@ -0,0 +1,166 @@
+"""
+Circuit breaker state machine and its use by the Gemini client, against a fake upstream
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.services import circuit_breaker, llm
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+QUOTA_ERROR = RuntimeError("429 RESOURCE_EXHAUSTED: quota exceeded")
+
+
+def _breaker(**overrides) -> CircuitBreaker:
+    options = dict(min_calls=4, failure_rate=0.5, cooldown_seconds=0.01, max_cooldown_seconds=1.0)
+    options.update(overrides)
+    return CircuitBreaker("test-model", **options)
+
+
+async def _wait_for_state(breaker: CircuitBreaker, state: str, timeout: float = 1.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while breaker.state != state:
+        assert loop.time() < deadline, f"breaker stuck in {breaker.state}, expected {state}"
+        await asyncio.sleep(0.005)
+
+
+def test_opens_once_failure_rate_reaches_threshold():
+    async def scenario():
+        breaker = _breaker(cooldown_seconds=60)
+        breaker.record_success()
+        breaker.record_success()
+        breaker.record_failure(QUOTA_ERROR)
+        # 1 of 3 calls failed: below min_calls and below the rate
+        assert breaker.state == CLOSED and breaker.allow()
+
+        breaker.record_failure(asyncio.TimeoutError())
+        # 2 of 4 calls failed: 50% over min_calls
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert not breaker.acquire_retry()
+
+    asyncio.run(scenario())
+
+
+def test_other_errors_do_not_trip():
+    async def scenario():
+        breaker = _breaker(cooldown_seconds=60)
+        for _ in range(10):
+            breaker.record_failure(ValueError("400 INVALID_ARGUMENT"))
+        assert breaker.state == CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_half_open_admits_only_the_probe_and_success_closes():
+    async def scenario():
+        seen = []
+
+        async def probe():
+            seen.append((breaker.state, breaker.allow()))
+
+        breaker = _breaker(probe=probe)
+        for _ in range(4):
+            breaker.record_failure(QUOTA_ERROR)
+        assert breaker.state == OPEN
+
+        await _wait_for_state(breaker, CLOSED)
+        # The probe ran as the single half-open trial; interactive calls stayed out
+        assert seen == [(HALF_OPEN, False)]
+        assert breaker.allow()
+        assert breaker._cooldown == breaker.cooldown_seconds
+
+    asyncio.run(scenario())
+
+
+def test_failed_probe_reopens_with_doubled_cooldown():
+    async def scenario():
+        attempts = []
+
+        async def probe():
+            attempts.append(breaker._cooldown)
+            if len(attempts) < 3:
+                raise QUOTA_ERROR
+
+        breaker = _breaker(probe=probe)
+        for _ in range(4):
+            breaker.record_failure(QUOTA_ERROR)
+
+        await _wait_for_state(breaker, CLOSED)
+        assert attempts == [0.01, 0.02, 0.04]
+        # Recovery resets the cool-down for the next trip
+        assert breaker._cooldown == 0.01
+
+    asyncio.run(scenario())
+
+
+class _FakeModels:
+    """Stands in for ``client.aio.models``: fails with quota errors while ``failing``"""
+
+    def __init__(self):
+        self.failing = True
+        self.calls = 0
+
+    async def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        if self.failing:
+            raise QUOTA_ERROR
+        return type("Response", (), {"text": "upstream reply"})()
+
+
+class _FakePool:
+    def __init__(self, models: _FakeModels):
+        self.client = type("Client", (), {})()
+        self.client.aio = type("Aio", (), {})()
+        self.client.aio.models = models
+
+    def __len__(self):
+        return 1
+
+    def has_capacity(self):
+        return True
+
+    @asynccontextmanager
+    async def lease(self, model):
+        yield self.client
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    model = "fake-gemini"
+    models = _FakeModels()
+    client = llm.EnhancedGenerativeAIClient()
+    client.use_mock = False
+    client._pool = _FakePool(models)
+    monkeypatch.setattr(llm.model_router, "chain", lambda messages, override=None: [model])
+    monkeypatch.setitem(
+        circuit_breaker._breakers,
+        model,
+        CircuitBreaker(model, probe=lambda: client._probe(model), min_calls=3, cooldown_seconds=0.05, max_retry_tokens=0)
+    )
+    return client, models, circuit_breaker._breakers[model]
+
+
+def test_client_uses_local_responder_while_open_and_recovers(fake_client):
+    client, models, breaker = fake_client
+    messages = [{"role": "user", "content": "I feel stressed about exams"}]
+
+    async def scenario():
+        for i in range(3):
+            reply = await client.chat(messages + [{"role": "user", "content": str(i)}])
+            assert reply != "upstream reply"
+        assert breaker.state == OPEN
+        calls = models.calls
+
+        # While open the upstream is not contacted at all
+        reply = await client.chat(messages)
+        assert reply != "upstream reply"
+        assert models.calls == calls
+
+        models.failing = False
+        await _wait_for_state(breaker, CLOSED)
+        assert await client.chat(messages) == "upstream reply"
+
+    asyncio.run(scenario())
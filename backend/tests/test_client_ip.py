@@ -0,0 +1,58 @@
+"""
+Client address resolution behind reverse proxies
+"""
+import logging
+
+import pytest
+from starlette.requests import Request
+
+from app.core import security
+
+
+def _request(peer: str, forwarded=None) -> Request:
+    headers = [(b"x-forwarded-for", value.encode()) for value in forwarded or []]
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+@pytest.fixture
+def proxies(monkeypatch):
+    monkeypatch.setattr(security, "_proxy_warning_logged", False)
+
+    def configure(count: int) -> None:
+        monkeypatch.setattr(security.settings, "trusted_proxy_count", count)
+    return configure
+
+
+def test_header_ignored_without_trusted_proxies(proxies):
+    proxies(0)
+    assert security.get_client_ip(_request("203.0.113.9", ["198.51.100.1"])) == "203.0.113.9"
+
+
+def test_client_is_counted_from_the_right(proxies):
+    proxies(1)
+    # The leftmost entry was supplied by the client and is not trusted
+    request = _request("10.0.0.2", ["1.2.3.4, 198.51.100.7"])
+    assert security.get_client_ip(request) == "198.51.100.7"
+    proxies(2)
+    request = _request("10.0.0.2", ["1.2.3.4", "198.51.100.7, 10.0.0.5"])
+    assert security.get_client_ip(request) == "198.51.100.7"
+
+
+def test_short_header_falls_back_to_peer(proxies):
+    proxies(2)
+    assert security.get_client_ip(_request("10.0.0.2", ["198.51.100.7"])) == "10.0.0.2"
+
+
+def test_unconfigured_proxy_is_reported_once(proxies, caplog):
+    proxies(0)
+    with caplog.at_level(logging.ERROR, logger=security.logger.name):
+        security.get_client_ip(_request("10.0.0.2", ["198.51.100.7"]))
+        security.get_client_ip(_request("10.0.0.3", ["198.51.100.8"]))
+    assert len([r for r in caplog.records if "TRUSTED_PROXY_COUNT" in r.getMessage()]) == 1
+
+
+def test_public_peer_with_header_is_not_reported(proxies, caplog):
+    proxies(0)
+    with caplog.at_level(logging.ERROR, logger=security.logger.name):
+        security.get_client_ip(_request("8.8.8.8", ["198.51.100.7"]))
+    assert not caplog.records
@@ -0,0 +1,61 @@
+"""
+Rolling summary: which aged-out messages are folded in
+"""
+import asyncio
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.db.models  # noqa: F401  (registers every table)
+from app.db.base_class import Base
+from app.db.models.chat import Conversation, Message
+from app.services import conversation_memory
+
+
+class _Summarizer:
+    def __init__(self):
+        self.seen = None
+
+    async def summarize(self, summary, messages, max_chars):
+        self.seen = messages
+        return "summary"
+
+
+def test_summary_includes_untyped_messages_and_skips_crisis(monkeypatch):
+    monkeypatch.setattr(conversation_memory.settings, "chat_history_messages", 2)
+    monkeypatch.setattr(conversation_memory.settings, "chat_summary_batch_messages", 1)
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_local = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        conversation = Conversation(id=uuid.uuid4(), user_id=uuid.uuid4(), last_seq=6, summary_through_seq=0)
+        rows = [
+            ("user", "untyped question", None),
+            ("assistant", "normal reply", "normal"),
+            ("user", "crisis message", "crisis"),
+            ("assistant", "untyped reply", None),
+            ("user", "recent", None),
+            ("assistant", "recent reply", "normal"),
+        ]
+        async with session_local() as db:
+            db.add(conversation)
+            for seq, (role, content, message_type) in enumerate(rows, start=1):
+                db.add(Message(
+                    conversation_id=conversation.id, seq=seq, role=role, content=content, message_type=message_type
+                ))
+            await db.commit()
+
+            summarizer = _Summarizer()
+            assert await conversation_memory.summarize_conversation(db, conversation.id, summarizer)
+        await engine.dispose()
+        return summarizer.seen
+
+    assert asyncio.run(scenario()) == [
+        {"role": "user", "content": "untyped question"},
+        {"role": "assistant", "content": "normal reply"},
+        {"role": "assistant", "content": "untyped reply"},
+    ]
@@ -0,0 +1,82 @@
+"""
+Golden classification and replies of the local (mock) responder
+"""
+import pytest
+
+from app.services import llm
+
+
+@pytest.fixture(autouse=True)
+def first_choice(monkeypatch):
+    # Replies are picked at random from each pool; always take the first one
+    monkeypatch.setattr(llm.random, "choice", lambda options: options[0])
+
+
+CRISIS = "I'm very concerned about you right now."
+GREETING = "Namaste! I'm YuVA, your wellness companion."
+HELP = "I'm here to support you with whatever you're going through."
+ANXIETY = "Anxiety can feel overwhelming, but you're not alone in this."
+STRESS = "Stress can feel like everything is happening at once."
+ACADEMIC = "Academic pressure is real, especially in competitive environments."
+SAD = "I can hear the sadness in your words"
+ANXIOUS = "I can feel the anxiety in your message"
+HAPPY = "I love hearing about your positive feelings!"
+GENERAL = "Thank you for sharing this with me. I can sense that there's a lot going on"
+
+
+@pytest.mark.parametrize("text, labels, reply", [
+    ("hi", {"greeting"}, GREETING),
+    ("Hello there", {"greeting"}, GREETING),
+    # "hi" inside "this" and "thing" is not a greeting
+    ("this thing is weird", set(), GENERAL),
+    ("Good morning! Had a great day at college", {"greeting", "emotion:happy"}, GREETING),
+    # "good" inside "goodbye" is not happiness
+    ("I said goodbye to my best friend today and I feel down", {"emotion:sad"}, SAD),
+    ("I have been worrying a lot, my thoughts keep racing", {"topic:anxiety"}, ANXIETY),
+    ("Racing thoughts and panics every night", {"topic:anxiety", "emotion:anxious"}, ANXIETY),
+    ("mujhe bahut tension ho rahi hai", {"topic:stress", "emotion:anxious"}, STRESS),
+    ("My exam anxiety and fear of failure", {"topic:academic_pressure"}, ACADEMIC),
+    ("feeling stressed and depressed", {"emotion:sad", "emotion:anxious"}, SAD),
+    ("I am so happy today", {"emotion:happy"}, HAPPY),
+    ("Café was great", {"emotion:happy"}, HAPPY),
+    ("nervous about tomorrow", {"emotion:anxious"}, ANXIOUS),
+    ("nothing really, just wanted to talk about my week", set(), GENERAL),
+    ("help", set(), HELP),
+    ("", set(), HELP),
+    # Crisis outranks every other hit
+    ("hi, I want to die", {"crisis:suicide", "greeting"}, CRISIS),
+    ("I feel hopeless and I keep worrying", {"crisis:hopelessness", "topic:anxiety"}, CRISIS),
+    ("Everyone would be better off dead", {"crisis:suicide"}, CRISIS),
+    ("I can't take it anymore", {"crisis:hopelessness"}, CRISIS),
+])
+def test_golden(text, labels, reply):
+    assert llm._MOCK_MATCHER.scan(text) == frozenset(labels)
+    assert llm._mock_model([{"role": "user", "content": text}]).startswith(reply)
+
+
+def test_topic_reply_has_technique_and_follow_up():
+    reply = llm._mock_model([{"role": "user", "content": "I keep worrying about everything"}])
+    assert reply == (
+        "Anxiety can feel overwhelming, but you're not alone in this. Let's try some grounding techniques together. "
+        "Here's something that might help: 4-7-8 breathing: Inhale for 4, hold for 7, exhale for 8 "
+        "What situations tend to trigger your anxiety the most?"
+    )
+
+
+def test_only_the_last_user_message_is_classified():
+    messages = [
+        {"role": "user", "content": "I want to die"},
+        {"role": "assistant", "content": "..."},
+        {"role": "user", "content": "hello"},
+    ]
+    assert llm._mock_model(messages).startswith(GREETING)
+
+
+def test_hinglish_mode_follows_the_system_prompt():
+    messages = [
+        {"role": "system", "content": "Reply in Hinglish"},
+        {"role": "user", "content": "hey"},
+    ]
+    assert llm._mock_model(messages).startswith("Namaste! Main YuVA hun")
+    messages[1]["content"] = "I want to end my life"
+    assert "Turant madad available hai" in llm._mock_model(messages)
@@ -0,0 +1,55 @@
+"""
+PhraseMatcher: whole-word, normalized, single-pass phrase matching
+"""
+import pytest
+
+from app.core.phrase_matcher import PhraseMatcher, inflections, words
+
+
+def _matcher() -> PhraseMatcher:
+    return (
+        PhraseMatcher(aliases={"wory": "worry"})
+        .add("greeting", ["hi", "good morning"])
+        .add("happy", ["good", "great"])
+        .add("anxiety", ["worry", "racing thoughts"], inflect=True)
+        .add("exam", ["exam"])
+        .add("exam_anxiety", ["exam anxiety"])
+    )
+
+
+def test_words_normalizes_case_accents_and_apostrophes():
+    assert words("Café CAN'T wait") == ["cafe", "cant", "wait"]
+    assert words("ख़ुशी है") == words("खुशी है")
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("worry", {"worry", "worrys", "worryed", "worrying", "worries", "worried"}),
+    ("panic", {"panic", "panics", "paniced", "panicing"}),
+    ("race", {"race", "races", "raceed", "raceing", "raced", "racing"}),
+    ("stress", {"stress", "stresss", "stressed", "stressing", "stresses"}),
+])
+def test_inflections(word, expected):
+    assert set(inflections(word)) == expected
+
+
+@pytest.mark.parametrize("text, labels", [
+    # Whole words only
+    ("hi", {"greeting"}),
+    ("this thing", set()),
+    ("goodbye", set()),
+    ("Good morning!", {"greeting", "happy"}),
+    # Overlapping phrases: every phrase ending at or starting inside another still counts
+    ("exam anxiety", {"exam", "exam_anxiety"}),
+    ("good morning, great exam", {"greeting", "happy", "exam"}),
+    ("my thoughts keep racing", set()),
+    ("racing thoughts", {"anxiety"}),
+    # Inflection applies to the last word of a phrase only
+    ("worried sick", {"anxiety"}),
+    ("my worries", {"anxiety"}),
+    ("raced thoughts", set()),
+    # Aliases are inflected like the word they stand for
+    ("woryed", {"anxiety"}),
+    ("", set()),
+])
+def test_scan(text, labels):
+    assert _matcher().scan(text) == frozenset(labels)
@@ -0,0 +1,92 @@
+"""
+Revocation list: the Bloom filter rebuilt by sync keeps local revocations
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.services.revocation import RevocationList, RevokedToken
+
+
+class _Rows:
+    def __init__(self, values):
+        self._values = values
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self._values)
+
+
+class _FakeDB:
+    """Just enough of AsyncSession: a revoked_tokens table and a hook after each read"""
+
+    def __init__(self, table: dict, after_read=None):
+        self.table = table
+        self.after_read = after_read
+        self._added = []
+
+    async def execute(self, statement):
+        if statement.is_delete:
+            return None
+        rows = _Rows([jti for jti, expires_at in self.table.items() if expires_at > datetime.now(timezone.utc)])
+        if self.after_read is not None:
+            hook, self.after_read = self.after_read, None
+            await hook()
+        return rows
+
+    def add(self, row: RevokedToken):
+        self._added.append(row)
+
+    async def commit(self):
+        for row in self._added:
+            self.table[row.jti] = row.expires_at
+        self._added.clear()
+
+    async def rollback(self):
+        self._added.clear()
+
+
+def _expiry(minutes: int = 30) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=minutes)
+
+
+def test_sync_picks_up_other_workers_revocations():
+    async def scenario():
+        table = {"other-worker": _expiry()}
+        revocations = RevocationList(capacity=100)
+        assert not revocations.might_be_revoked("other-worker")
+        assert await revocations.sync(_FakeDB(table)) == 1
+        assert revocations.might_be_revoked("other-worker")
+
+    asyncio.run(scenario())
+
+
+def test_revocation_landing_during_sync_is_kept():
+    async def scenario():
+        table = {}
+        revocations = RevocationList(capacity=100)
+
+        async def logout():
+            # Commits after the sync has read the table, before it swaps filters
+            await revocations.revoke(_FakeDB(table), "logged-out", _expiry())
+
+        await revocations.sync(_FakeDB(table, after_read=logout))
+        assert revocations.might_be_revoked("logged-out")
+
+        # Once a sync has read it back it is carried by the table alone
+        await revocations.sync(_FakeDB(table))
+        assert revocations._unsynced == {}
+        assert revocations.might_be_revoked("logged-out")
+
+    asyncio.run(scenario())
+
+
+def test_expired_local_revocations_are_dropped():
+    async def scenario():
+        revocations = RevocationList(capacity=100)
+        await revocations.revoke(_FakeDB({}), "expired", _expiry(-1))
+        await revocations.sync(_FakeDB({}))
+        assert revocations._unsynced == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,46 @@
+"""
+Crisis detection across spellings, inflections and negations
+"""
+import pytest
+
+from app.services.safety import crisis_category, detect_crisis
+
+
+@pytest.mark.parametrize("text, category", [
+    ("I want to kill myself", "suicide"),
+    ("I keep thinking about killing myself", "suicide"),
+    ("two suicides at my school this year", "suicide"),
+    ("I've been having suicidal thoughts", "suicide"),
+    ("sometimes I feel like ending my life", "suicide"),
+    ("I do not want to live anymore", "suicide"),
+    ("I don't want to live", "suicide"),
+    ("I dont want to be alive", "suicide"),
+    ("I don’t wanna live like this", "suicide"),
+    ("thinking about sucide", "suicide"),
+    ("mujhe jeena nahi chahta", "suicide"),
+    ("मैं जीना नहीं चाहता", "suicide"),
+    ("I have been self-harming again", "self_harm"),
+    ("self harmed last night", "self_harm"),
+    ("I keep hurting myself", "self_harm"),
+    ("I started harming myself", "self_harm"),
+    ("I feel hopeless", "hopelessness"),
+    ("I can't go on", "hopelessness"),
+    # Most severe category wins
+    ("I'm hopeless and want to die", "suicide"),
+])
+def test_detects(text, category):
+    assert crisis_category(text) == category
+    assert detect_crisis(text)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "I had a good day",
+    "I want to live a long life",
+    "she is so selfish",
+    "my team scored no points",
+    "the harmony class was fun",
+])
+def test_ignores(text):
+    assert crisis_category(text) is None
+    assert not detect_crisis(text)
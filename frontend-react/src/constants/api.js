@@ -29,7 +29,9 @@ export const API_ENDPOINTS = {
         BASE: '/api/assessment'
     },
     AI: {
-        CHAT: '/api/ai/chat'
+        CHAT: '/api/ai/chat',
+        CONVERSATIONS: '/api/ai/conversations?limit=1',
+        MESSAGES: (conversationId) => `/api/ai/conversations/${conversationId}/messages?limit=50`
     },
     ANALYTICS: {
         SUMMARY: '/api/analytics',
@@ -174,6 +174,10 @@ export const AuthProvider = ({ children }) => {
                 recovery_code: recoveryCode,
                 new_password: newPassword
             });
+            // Password changes revoke existing tokens; keep this session on the fresh one
+            if (result.success && result.data.access_token) {
+                localStorage.setItem('access_token', result.data.access_token);
+            }
             return result;
         } catch (error) {
             return { success: false, error: error.message };
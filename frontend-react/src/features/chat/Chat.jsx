@@ -478,10 +478,11 @@ const OpenChat = () => {
         setTyping(true);
 
         try {
+            // Lets the backend recognise double submits and retries of this message
             const result = await ApiClient.post('/api/ai/chat', {
                 text: text,
                 model: selectedModel
-            });
+            }, { 'Idempotency-Key': crypto.randomUUID() });
 
             // Expected response format from backend: { reply: "...", type: "...", confidence: 0.9 }
             let replyText = "I'm listening. Please go on.";
@@ -1,5 +1,7 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import { useAuth } from '../auth/useAuth';
+import ApiClient from '../../services/apiClient';
+import { API_ENDPOINTS } from '../../constants/api';
 
 const ChatContext = createContext();
 
@@ -41,6 +43,35 @@ export const ChatProvider = ({ children }) => {
         }
     }, [user]);
 
+    // Restore the latest conversation on login; the browser revalidates the
+    // cached pages with their ETags, so an unchanged history is a 304
+    useEffect(() => {
+        if (!user) return;
+        let cancelled = false;
+
+        const loadHistory = async () => {
+            const list = await ApiClient.get(API_ENDPOINTS.AI.CONVERSATIONS);
+            const latest = list.success && list.data.conversations?.[0];
+            if (!latest || latest.message_count === 0) return;
+
+            const page = await ApiClient.get(API_ENDPOINTS.AI.MESSAGES(latest.id));
+            if (cancelled || !page.success || page.data.messages.length === 0) return;
+
+            // Don't overwrite a conversation the user has already started here
+            setMessages(prev => prev.length > INITIAL_MESSAGES.length ? prev : [
+                ...INITIAL_MESSAGES,
+                ...page.data.messages.map(m => ({
+                    sender: m.role === 'user' ? 'user' : 'assistant',
+                    text: m.content,
+                    timestamp: new Date(m.created_at)
+                }))
+            ]);
+        };
+
+        loadHistory();
+        return () => { cancelled = true; };
+    }, [user]);
+
     const clearChat = () => {
         setMessages(INITIAL_MESSAGES);
         setChatInput('');
@@ -17,7 +17,7 @@ class ApiClient {
             }
         };
 
-        const config = { ...defaultOptions, ...options };
+        const config = { ...defaultOptions, ...options, headers: defaultOptions.headers };
 
         try {
             const response = await fetch(url, config);
@@ -45,9 +45,10 @@ class ApiClient {
         return this.request(endpoint, { method: 'GET' });
     }
 
-    static post(endpoint, data) {
+    static post(endpoint, data, headers = {}) {
         return this.request(endpoint, {
             method: 'POST',
+            headers,
             body: JSON.stringify(data)
         });
     }